@@ -0,0 +1,507 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from io import BytesIO
+
+import sp_api
+import sqlite_store
+import tracing
+from batch_pipeline import run_designs
+from feed_poller import GAVE_UP, TERMINAL_STATUSES, FeedPoller
+from feed_sharding import shard_messages, submit_shards
+from image_prep import prepare_images
+from listing_feed import format_slug, generate_listing_messages
+from lwa_token import TokenCache
+from product_catalog import get_catalog
+from report_store import ReportStore
+from shopify_api import cached_imgbb_upload, upload_and_create_shopify_product
+from shopify_bulk import bulk_create_products, featured_image_srcs
+from upload_cache import UploadCache, content_digest
+
+DEFAULT_DB_PATH = "batch_jobs.db"
+DEFAULT_JOBS_DIR = "batch_jobs"
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+SECRET_KEYS = [
+    "SHOPIFY_TOKEN", "SHOPIFY_STORE", "IMGBB_API_KEY", "LWA_CLIENT_ID", "LWA_CLIENT_SECRET",
+    "REFRESH_TOKEN", "MARKETPLACE_ID", "SELLER_ID"
+]
+POLL_INTERVAL = 5
+POLL_TIMEOUT = 6 * 3600  # a feed still unfinished after this is marked failed
+MAX_SLUG_ATTEMPTS = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    error TEXT,
+    bulk_shopify INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    file_stem TEXT NOT NULL,
+    title_full TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    payload_path TEXT,
+    status TEXT NOT NULL,
+    slug TEXT,
+    image_url TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS job_feeds (
+    job_id TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    skus TEXT NOT NULL,
+    status TEXT NOT NULL,
+    feed_id TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, shard)
+);
+"""
+
+# Job status moves queued -> uploading -> submitting -> polling -> done, or to failed on an unexpected error.
+# Items are pending, uploaded, failed (retried on the next run) or invalid (image rejected; never retried).
+# Feed shards are pending, submitted, failed (retried on the next run) or a terminal SP-API processing status.
+ACTIVE_JOB_STATUSES = ("queued", "uploading", "submitting", "polling")
+
+
+def load_secrets(path=SECRETS_PATH):
+    """
+    Reads the same secrets.toml that Streamlit uses; environment variables of the same name take precedence.
+    """
+    secrets = {}
+    if os.path.exists(path):
+        import tomllib
+        with open(path, "rb") as f:
+            secrets.update(tomllib.load(f))
+    for key in SECRET_KEYS:
+        if os.environ.get(key):
+            secrets[key] = os.environ[key]
+    missing = [key for key in SECRET_KEYS if not secrets.get(key)]
+    if missing:
+        raise KeyError(f"Missing secrets: {', '.join(missing)}")
+    return secrets
+
+
+def design_titles(file_name, product_line=None):
+    line = get_catalog().line(product_line)
+    file_stem = os.path.splitext(os.path.basename(file_name))[0]
+    title_full = file_stem.replace("-", " ").replace("_", " ").title() + f" - {line.title_suffix}"
+    handle = file_stem.lower().replace(" ", "-").replace("_", "-") + f"-{line.handle_suffix}"
+    return file_stem, title_full, handle
+
+
+class JobStore:
+    """
+    SQLite checkpoint store for batch jobs; design payloads are kept as files under jobs_dir.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, jobs_dir=DEFAULT_JOBS_DIR):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        sqlite_store.initialize(self.path, SCHEMA, {"jobs": {"bulk_shopify": "INTEGER NOT NULL DEFAULT 0"}})
+
+    def _connect(self):
+        return sqlite_store.connect(self.path)
+
+    def create_job(self, prepared, bulk_shopify=False):
+        """
+        Stores image_prep results as a new queued job and returns its id.
+        With bulk_shopify the job creates its Shopify products through one GraphQL bulk operation.
+        """
+        job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        rows, first_copy = [], {}
+        for idx, prep in enumerate(prepared):
+            file_stem, title_full, handle = design_titles(prep["name"])
+            status, error = ("invalid", "; ".join(prep["errors"])) if prep["errors"] else ("pending", None)
+            if status == "pending":
+                # the same image under the same title would share one cached slug and so one set of SKUs;
+                # only its first copy is listed
+                key = (content_digest(prep["payload"]), handle)
+                if key in first_copy:
+                    status, error = "invalid", f"Duplicate of {first_copy[key]!r} in this job"
+                else:
+                    first_copy[key] = prep["name"]
+            payload_path = None
+            if prep["payload"] and status == "pending":
+                payload_path = os.path.join(job_dir, f"{idx}.png")
+                with open(payload_path, "wb") as f:
+                    f.write(prep["payload"])
+            rows.append((job_id, idx, prep["name"], file_stem, title_full, handle, payload_path, status, error))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, created_at, updated_at, bulk_shopify) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, now, now, int(bulk_shopify))
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, name, file_stem, title_full, handle, payload_path, status, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return job_id
+
+    def set_job_status(self, job_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                         (status, error, time.time(), job_id))
+
+    def update_item(self, job_id, idx, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE job_items SET {assignments} WHERE job_id = ? AND idx = ?",
+                         (*fields.values(), job_id, idx))
+
+    def add_feeds(self, job_id, shard_skus, start=0):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO job_feeds (job_id, shard, skus, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, shard, json.dumps(skus)) for shard, skus in enumerate(shard_skus, start=start)]
+            )
+
+    def update_feed(self, job_id, shard, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE job_feeds SET {assignments} WHERE job_id = ? AND shard = ?",
+                         (*fields.values(), job_id, shard))
+
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list_jobs(self, limit=20):
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+
+    def active_jobs(self):
+        marks = ", ".join("?" for _ in ACTIVE_JOB_STATUSES)
+        with self._connect() as conn:
+            return [row["job_id"] for row in conn.execute(
+                f"SELECT job_id FROM jobs WHERE status IN ({marks}) ORDER BY created_at", ACTIVE_JOB_STATUSES
+            )]
+
+    def items(self, job_id):
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+            )]
+
+    def slugs(self, job_id):
+        with self._connect() as conn:
+            return {row["slug"] for row in conn.execute(
+                "SELECT slug FROM job_items WHERE job_id = ? AND slug IS NOT NULL", (job_id,)
+            )}
+
+    def feeds(self, job_id):
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(
+                "SELECT * FROM job_feeds WHERE job_id = ? ORDER BY shard", (job_id,)
+            )]
+        for row in rows:
+            row["skus"] = json.loads(row["skus"])
+        return rows
+
+    def summary(self, job_id):
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        counts = {}
+        for item in self.items(job_id):
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        feeds = self.feeds(job_id)
+        return dict(job, items=counts, feeds=[
+            {"shard": f["shard"], "status": f["status"], "feedId": f["feed_id"], "skus": len(f["skus"]),
+             "error": f["error"]} for f in feeds
+        ])
+
+
+class JobRunner:
+    """
+    Runs batch jobs step by step (upload, Shopify create, feed build, submit, poll), checkpointing after
+    every design and every feed shard so a stopped job resumes where it left off when run again.
+    """
+
+    def __init__(self, secrets, store=None, upload_cache=None, report_store=None, token_cache=None, poller=None,
+                 poll_interval=POLL_INTERVAL, poll_timeout=POLL_TIMEOUT):
+        self.secrets = secrets
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.store = store or JobStore()
+        self.upload_cache = upload_cache or UploadCache()
+        self.report_store = report_store or ReportStore()
+        self.token_cache = token_cache or TokenCache(
+            secrets["LWA_CLIENT_ID"], secrets["LWA_CLIENT_SECRET"], secrets["REFRESH_TOKEN"]
+        )
+        self.poller = poller or FeedPoller(self.token_cache.get, on_report=self.report_store.ingest_report)
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def submit(self, files, bulk_shopify=False):
+        """
+        Validates and optimizes (name, bytes) pairs, stores them as a new job and returns (job_id, prepared).
+        """
+        prepared = prepare_images(files)
+        return self.store.create_job(prepared, bulk_shopify), prepared
+
+    def start(self, job_id):
+        """
+        Runs the job on a background thread unless it is already running in this process.
+        """
+        with self._lock:
+            if job_id in self._running:
+                return
+            self._running.add(job_id)
+        threading.Thread(target=self._run_and_release, args=(job_id,), daemon=True).start()
+
+    def resume_all(self):
+        for job_id in self.store.active_jobs():
+            self.start(job_id)
+
+    def _run_and_release(self, job_id):
+        try:
+            self.run(job_id)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def run(self, job_id):
+        """
+        Runs the job to completion under one tracing span and exports the traces when it stops. A failed
+        export is reported on stderr and never replaces the job's own result or error.
+        """
+        try:
+            with tracing.span("job", job_id=job_id):
+                self.store.set_job_status(job_id, "uploading")
+                self._upload(job_id)
+                self.store.set_job_status(job_id, "submitting")
+                self._submit_feeds(job_id)
+                self.store.set_job_status(job_id, "polling")
+                self._poll(job_id)
+                self.store.set_job_status(job_id, "done")
+        except Exception as e:
+            self.store.set_job_status(job_id, "failed", str(e))
+            raise
+        finally:
+            try:
+                tracing.export()
+            except Exception as e:
+                print(f"Trace export for job {job_id} failed: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _payload(item):
+        with open(item["payload_path"], "rb") as f:
+            return BytesIO(f.read())
+
+    def _upload_item(self, item):
+        return upload_and_create_shopify_product(
+            self._payload(item), item["handle"], item["title_full"], self.secrets["SHOPIFY_STORE"],
+            self.secrets["SHOPIFY_TOKEN"], self.secrets["IMGBB_API_KEY"], cache=self.upload_cache
+        )
+
+    def _imgbb_item(self, item):
+        return cached_imgbb_upload(self._payload(item), item["handle"], self.secrets["IMGBB_API_KEY"],
+                                   self.upload_cache)
+
+    def _new_slug(self, job_id, file_stem):
+        # format_slug is only initials plus a random number, so titles sharing initials can draw the same slug;
+        # it must be free both in this job and among the designs listed by earlier runs
+        taken = self.store.slugs(job_id)
+        for _ in range(MAX_SLUG_ATTEMPTS):
+            slug = format_slug(file_stem)
+            if slug not in taken and not self.upload_cache.slug_taken(slug):
+                return slug
+        raise RuntimeError(f"No free slug for {file_stem!r} after {MAX_SLUG_ATTEMPTS} attempts")
+
+    def _slug(self, job_id, item):
+        # the slug is fixed once per design in the upload cache, so a resumed job or a later job with the same
+        # image and handle regenerates exactly the same SKUs instead of listing the design again
+        if item["slug"]:
+            return item["slug"]
+        digest = content_digest(self._payload(item).getvalue())
+        cached = self.upload_cache.get(digest, item["handle"]) or {}
+        return cached.get("slug") or self.upload_cache.claim_slug(
+            digest, item["handle"], self._new_slug(job_id, item["file_stem"])
+        )
+
+    def _mark_uploaded(self, job_id, item, image_url):
+        self.store.update_item(job_id, item["idx"], status="uploaded", image_url=image_url,
+                               slug=self._slug(job_id, item), error=None)
+
+    def _upload(self, job_id):
+        pending = [item for item in self.store.items(job_id) if item["status"] in ("pending", "failed")]
+        if self.store.get_job(job_id)["bulk_shopify"]:
+            self._upload_bulk(job_id, pending)
+            return
+        for record in run_designs(pending, self._upload_item):
+            item = record["design"]
+            if record["ok"]:
+                self._mark_uploaded(job_id, item, record["result"])
+            else:
+                self.store.update_item(job_id, item["idx"], status="failed", error=record["error"])
+
+    def _upload_bulk(self, job_id, pending):
+        # ImgBB uploads still run in parallel; only the Shopify side is batched into one bulk operation
+        to_create, processing = [], []
+        for record in run_designs(pending, self._imgbb_item):
+            item = record["design"]
+            if not record["ok"]:
+                self.store.update_item(job_id, item["idx"], status="failed", error=record["error"])
+                continue
+            digest, cached, image_url = record["result"]
+            if cached.get("image_src"):
+                self._mark_uploaded(job_id, item, cached["image_src"])
+            elif cached.get("product_id"):
+                # created by an earlier bulk run before Shopify had processed its media
+                processing.append(dict(item, digest=digest, image_url=image_url, product_id=cached["product_id"]))
+            else:
+                to_create.append(dict(item, digest=digest, image_url=image_url))
+        store, token = self.secrets["SHOPIFY_STORE"], self.secrets["SHOPIFY_TOKEN"]
+        results = bulk_create_products(to_create, store, token)
+        images = featured_image_srcs(store, token, [item["product_id"] for item in processing]) if processing else {}
+        results += [{"product_id": item["product_id"], "image_src": images.get(item["product_id"]), "error": None}
+                    for item in processing]
+        for item, result in zip(to_create + processing, results):
+            if result["error"]:
+                self.store.update_item(job_id, item["idx"], status="failed", error=result["error"])
+                continue
+            # only a Shopify CDN url is cached as image_src; until Shopify has one the design is listed with its
+            # ImgBB url and the next run asks again
+            self.upload_cache.put_product(item["digest"], item["handle"], result["product_id"], result["image_src"])
+            self._mark_uploaded(job_id, item, result["image_src"] or item["image_url"])
+
+    def _messages(self, job_id):
+        messages, seen = [], {}
+        for item in self.store.items(job_id):
+            if item["status"] != "uploaded":
+                continue
+            for message in generate_listing_messages(item["file_stem"], item["image_url"], item["slug"]):
+                if message["sku"] in seen:
+                    raise ValueError(f"Duplicate SKU {message['sku']} in job {job_id}: "
+                                     f"{seen[message['sku']]!r} and {item['name']!r}")
+                seen[message["sku"]] = item["name"]
+                messages.append(message)
+        return messages
+
+    def _submit_feeds(self, job_id):
+        feeds = self.store.feeds(job_id)
+        messages = self._messages(job_id)
+        # designs that only finished uploading on a later run get shards of their own
+        covered = {sku for feed in feeds for sku in feed["skus"]}
+        uncovered = [m for m in messages if m["sku"] not in covered]
+        if uncovered:
+            self.store.add_feeds(job_id, [[m["sku"] for m in shard] for shard in shard_messages(uncovered)],
+                                 start=len(feeds))
+            feeds = self.store.feeds(job_id)
+        by_sku = {m["sku"]: m for m in messages}
+        pending = [feed for feed in feeds if feed["status"] in ("pending", "failed")]
+        shards = [[{**by_sku[sku], "messageId": idx} for idx, sku in enumerate(feed["skus"], start=1)]
+                  for feed in pending]
+        # shards go out in parallel and each one is checkpointed as soon as its createFeed call returns
+        for idx, feed_id, error in submit_shards(shards, self._submit_shard):
+            feed = pending[idx]
+            if error:
+                self.store.update_feed(job_id, feed["shard"], status="failed", error=error)
+                continue
+            self.report_store.register_feed(feed_id, feed["skus"])
+            self.store.update_feed(job_id, feed["shard"], status="submitted", feed_id=feed_id, error=None)
+
+    def _submit_shard(self, shard):
+        return sp_api.submit_json_listings_feed(
+            shard, self.secrets["SELLER_ID"], self.secrets["MARKETPLACE_ID"], self.token_cache.get
+        )
+
+    def _poll(self, job_id):
+        waiting = {f["feed_id"]: f["shard"] for f in self.store.feeds(job_id) if f["status"] == "submitted"}
+        for feed_id in waiting:
+            self.poller.track(feed_id)
+        deadline = time.monotonic() + self.poll_timeout
+        failed = []
+        while waiting:
+            time.sleep(self.poll_interval)
+            for feed_id, state in self.poller.snapshot(list(waiting)).items():
+                if state["status"] == GAVE_UP:
+                    self.store.update_feed(job_id, waiting.pop(feed_id), status="failed", error=state["error"])
+                    failed.append(feed_id)
+                # a DONE feed counts as finished once its processing report has been stored
+                elif state["status"] in TERMINAL_STATUSES and (state["status"] != "DONE" or state["report"]):
+                    self.store.update_feed(job_id, waiting.pop(feed_id), status=state["status"])
+            if waiting and time.monotonic() > deadline:
+                for feed_id, shard in waiting.items():
+                    self.store.update_feed(job_id, shard, status="failed",
+                                           error=f"Not finished within {self.poll_timeout}s")
+                failed += list(waiting)
+                waiting.clear()
+        if failed:
+            # failed shards are submitted again when the job is resumed
+            raise RuntimeError(f"Polling failed for feeds {', '.join(failed)}")
+
+
+def _read_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(n for n in os.listdir(path) if n.lower().endswith(".png"))
+            paths_in_dir = [os.path.join(path, n) for n in names]
+        else:
+            paths_in_dir = [path]
+        for file_path in paths_in_dir:
+            with open(file_path, "rb") as f:
+                files.append((os.path.basename(file_path), f.read()))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Shopify + Amazon listing batch jobs without Streamlit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="create a job from PNG files or folders and run it")
+    submit.add_argument("paths", nargs="+")
+    submit.add_argument("--no-run", action="store_true", help="only create the job")
+    submit.add_argument("--bulk-shopify", action="store_true",
+                        help="create Shopify products with one GraphQL bulk operation instead of REST calls")
+    run = commands.add_parser("run", help="run or resume one job")
+    run.add_argument("job_id")
+    commands.add_parser("resume", help="resume every unfinished job")
+    status = commands.add_parser("status", help="show one job or the most recent jobs")
+    status.add_argument("job_id", nargs="?")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        store = JobStore()
+        if args.job_id:
+            print(json.dumps(store.summary(args.job_id), indent=2))
+        else:
+            for job in store.list_jobs():
+                print(f"{job['job_id']}  {job['status']}  {job['error'] or ''}")
+        return 0
+
+    runner = JobRunner(load_secrets())
+    if args.command == "submit":
+        job_id, prepared = runner.submit(_read_files(args.paths), bulk_shopify=args.bulk_shopify)
+        print(f"Created job {job_id} with {len(prepared)} designs")
+        job_ids = [] if args.no_run else [job_id]
+    elif args.command == "run":
+        job_ids = [args.job_id]
+    else:
+        job_ids = runner.store.active_jobs()
+
+    for job_id in job_ids:
+        print(f"Running job {job_id}...")
+        runner.run(job_id)
+        print(json.dumps(runner.store.summary(job_id), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import tracing
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def run_designs(designs, worker, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Runs worker(design) for every design on a thread pool.
+    Per-host concurrency is bounded by http_client.HOST_LIMITER. Spans opened by worker nest under the
+    caller's current tracing span.
+
+    Yields one record per design as soon as it finishes:
+    {"design": design, "ok": bool, "result": worker return value or None, "error": str or None}
+    Failures are recorded per design and never stop the rest of the batch.
+    """
+    if not designs:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(designs))) as pool:
+        worker = tracing.wrap(worker)
+        futures = {pool.submit(worker, design): design for design in designs}
+        for future in as_completed(futures):
+            design = futures[future]
+            try:
+                yield {"design": design, "ok": True, "result": future.result(), "error": None}
+            except Exception as e:
+                yield {"design": design, "ok": False, "result": None, "error": str(e)}
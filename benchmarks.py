@@ -0,0 +1,730 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+from PIL import Image
+
+import http_client
+import tracing
+from batch_jobs import JobRunner, JobStore
+from batch_pipeline import run_designs
+from feed_poller import FeedPoller
+from feed_writer import write_feed
+from image_prep import prepare_images
+from inventory_feed_submitter import InventorySnapshot, submit_inventory_feed
+from listing_feed import generate_listing_messages
+from lwa_token import TokenCache
+from product_catalog import get_catalog, load_catalog
+from rate_limiter import RequestScheduler
+from report_store import ReportStore
+from shopify_api import upload_and_create_shopify_product, upload_image_to_imgbb
+from shopify_bulk import bulk_create_products
+from simulator import Simulator
+from upload_cache import UploadCache
+
+# Offline benchmarks against simulator.Simulator; nothing here talks to Amazon, Shopify or ImgBB.
+#   python benchmarks.py pipeline --sizes 10 100 500
+#   python benchmarks.py inventory --sizes 1000 100000 1000000
+#   python benchmarks.py all --output bench.json
+
+SECRETS = {
+    "SHOPIFY_TOKEN": "shpat_sim",
+    "SHOPIFY_STORE": "sim-store.myshopify.com",
+    "IMGBB_API_KEY": "sim",
+    "LWA_CLIENT_ID": "sim",
+    "LWA_CLIENT_SECRET": "sim",
+    "REFRESH_TOKEN": "sim",
+    "SELLER_ID": "A1SIMSELLER",
+    "MARKETPLACE_ID": "ATVPDKIKX0DER"
+}
+DEFAULT_RATE_SCALE = 100  # real createFeed allows one call per two minutes; offline runs go faster
+
+
+@contextmanager
+def simulated(rate_scale=DEFAULT_RATE_SCALE, **simulator_options):
+    """
+    Starts a simulator, points every endpoint at it and gives http_client a fresh session, scheduler,
+    metrics and tracer so each benchmark run is measured on its own.
+    """
+    scheduler = http_client.SCHEDULER
+    with Simulator(rate_scale=rate_scale, **simulator_options).start() as sim:
+        sim.configure_endpoints()
+        http_client.configure(verify=sim.cert_path)
+        http_client.SCHEDULER = RequestScheduler(rate_scale=rate_scale)
+        http_client.METRICS.reset()
+        tracing.TRACER.reset()
+        try:
+            yield sim
+        finally:
+            http_client.SCHEDULER = scheduler
+            http_client.configure()
+
+
+def make_png(index, side=1000):
+    # a distinct colour per index gives every design its own content hash
+    image = Image.new("RGB", (side, side), (index % 256, (index // 256) % 256, 128))
+    out = BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def make_noisy_png(index, side):
+    image = Image.effect_noise((side, side), 64 + index % 32).convert("RGB")
+    out = BytesIO()
+    image.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+def _stage_seconds():
+    return {r["stage"]: round(r["total_seconds"], 3) for r in tracing.TRACER.summary()["stages"]}
+
+
+def _http_latency():
+    spans = [s["seconds"] for s in tracing.TRACER.spans() if s["attrs"].get("kind") == "http"]
+    if not spans:
+        return None, None
+    spans.sort()
+    return tracing._quantile(spans, 0.5), tracing._quantile(spans, 0.95)
+
+
+def _throttled(sim):
+    return sum(stats["throttled"] for stats in sim.snapshot().values())
+
+
+# === FULL PIPELINE ===
+
+def _run_job(workdir, files, bulk_shopify, upload_cache=None):
+    token_cache = TokenCache("sim", "sim", "sim", background=False)
+    report_store = ReportStore(os.path.join(workdir, "reports.db"))
+    poller = FeedPoller(token_cache.get, on_report=report_store.ingest_report, initial_delay=0.1, max_delay=1.0)
+    runner = JobRunner(
+        SECRETS,
+        store=JobStore(os.path.join(workdir, "jobs.db"), os.path.join(workdir, "jobs")),
+        upload_cache=upload_cache or UploadCache(os.path.join(workdir, "uploads.db")),
+        report_store=report_store, token_cache=token_cache, poller=poller, poll_interval=0.1
+    )
+    try:
+        start = time.perf_counter()
+        job_id, _ = runner.submit(files, bulk_shopify=bulk_shopify)
+        prepared = time.perf_counter()
+        runner.run(job_id)
+        done = time.perf_counter()
+    finally:
+        poller.stop()
+    summary = runner.store.summary(job_id)
+    return {
+        "prep_seconds": round(prepared - start, 3),
+        "run_seconds": round(done - prepared, 3),
+        "items": summary["items"],
+        "feeds": len(summary["feeds"])
+    }
+
+
+def bench_pipeline(sizes=(10, 100), bulk_shopify=False, latency=0.05, rate_scale=DEFAULT_RATE_SCALE, rerun=True):
+    """
+    The full multi-file job (image prep, ImgBB, Shopify, feed build, submit, poll) at increasing batch sizes.
+    With rerun, the same files run again with the same upload cache to show what the cache saves.
+    """
+    rows = []
+    for size in sizes:
+        files = [(f"design-{i}.png", make_png(i)) for i in range(size)]
+        with tempfile.TemporaryDirectory() as workdir, \
+                simulated(rate_scale, latency=latency, processing_time=0.5) as sim:
+            result = _run_job(workdir, files, bulk_shopify)
+            p50, p95 = _http_latency()
+            row = {
+                "designs": size,
+                "bulk_shopify": bulk_shopify,
+                **result,
+                "designs_per_second": round(size / (result["prep_seconds"] + result["run_seconds"]), 2),
+                "http_p50": round(p50, 4),
+                "http_p95": round(p95, 4),
+                "connections": sum(http_client.connections_opened().values()),
+                "throttled": _throttled(sim),
+                "stages": _stage_seconds()
+            }
+            if rerun:
+                again = _run_job(workdir, files, bulk_shopify, UploadCache(os.path.join(workdir, "uploads.db")))
+                row["rerun_seconds"] = again["run_seconds"]
+                row["rerun_saved_seconds"] = round(result["run_seconds"] - again["run_seconds"], 3)
+            rows.append(row)
+    return rows
+
+
+# === INVENTORY FEEDS ===
+
+def bench_inventory(sizes=(1000, 10000, 100000), latency=0.05, change_share=0.01):
+    """
+    submit_inventory_feed at increasing catalog sizes: the full feed, then a delta run against a snapshot
+    after change_share of the SKUs changed quantity.
+    """
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir, simulated(latency=latency) as sim:
+            snapshot = InventorySnapshot(os.path.join(workdir, "snapshot.db"))
+            skus = {f"SKU-{i:07d}": 10 for i in range(size)}
+            start = time.perf_counter()
+            submit_inventory_feed(skus, "token", SECRETS["MARKETPLACE_ID"], SECRETS["SELLER_ID"], snapshot=snapshot)
+            full_seconds = time.perf_counter() - start
+            full_bytes = sum(doc["bytes"] for doc in sim.documents.values())
+
+            for i in random.Random(size).sample(range(size), max(1, int(size * change_share))):
+                skus[f"SKU-{i:07d}"] = 5
+            start = time.perf_counter()
+            submit_inventory_feed(skus, "token", SECRETS["MARKETPLACE_ID"], SECRETS["SELLER_ID"], snapshot=snapshot)
+            delta_seconds = time.perf_counter() - start
+            rows.append({
+                "skus": size,
+                "full_seconds": round(full_seconds, 3),
+                "full_skus_per_second": round(size / full_seconds),
+                "full_bytes": full_bytes,
+                "delta_seconds": round(delta_seconds, 3),
+                "delta_bytes": sum(doc["bytes"] for doc in sim.documents.values()) - full_bytes
+            })
+    return rows
+
+
+# === CONCURRENCY AND CONNECTIONS ===
+
+def bench_concurrency(sizes=(10, 100, 1000), latency=0.05, workers=(1, 16)):
+    """
+    Wall clock of upload_and_create_shopify_product (an ImgBB upload, then a Shopify product) for every design,
+    run sequentially vs on run_designs' thread pool, and the TCP connections opened.
+    """
+    rows = []
+    for size in sizes:
+        row = {"designs": size}
+        for max_workers in workers:
+            with simulated(latency=latency) as sim:
+                start = time.perf_counter()
+                results = list(run_designs(list(range(size)), lambda i: upload_and_create_shopify_product(
+                    BytesIO(b"\x89PNG" + i.to_bytes(4, "big") + bytes(1024)), f"design-{i}", f"Design {i}",
+                    SECRETS["SHOPIFY_STORE"], SECRETS["SHOPIFY_TOKEN"], SECRETS["IMGBB_API_KEY"]
+                ), max_workers=max_workers))
+                row[f"seconds_{max_workers}_workers"] = round(time.perf_counter() - start, 3)
+                row[f"connections_{max_workers}_workers"] = sum(http_client.connections_opened().values())
+                row["failed"] = sum(1 for r in results if not r["ok"])
+                row["shopify_products"] = len(sim.products)
+        row["speedup"] = round(row[f"seconds_{workers[0]}_workers"] / row[f"seconds_{workers[-1]}_workers"], 1)
+        rows.append(row)
+    return rows
+
+
+def bench_connections(skus=500, tls=True, latency=0.01, rate_scale=1000):
+    """
+    Connections each simulated host accepted over HTTPS during a run of skus designs: an LWA token, an ImgBB
+    upload and a Shopify product per design, then one inventory feed for every SKU polled until its report is in.
+    Without the shared keep-alive session every request would pay its own TCP and TLS handshake.
+    """
+    with simulated(rate_scale=rate_scale, latency=latency, tls=tls, processing_time=0.2) as sim:
+        token_cache = TokenCache("sim", "sim", "sim", background=False)
+        start = time.perf_counter()
+        results = list(run_designs(list(range(skus)), lambda i: upload_and_create_shopify_product(
+            BytesIO(b"\x89PNG" + i.to_bytes(4, "big")), f"design-{i}", f"Design {i}", SECRETS["SHOPIFY_STORE"],
+            "sim", "sim"
+        )))
+        feed_id = submit_inventory_feed({f"SKU-{i}": 10 for i in range(skus)}, token_cache.get,
+                                        SECRETS["MARKETPLACE_ID"], SECRETS["SELLER_ID"])
+        reports = []
+        poller = FeedPoller(token_cache.get, on_report=lambda *args: reports.append(args), initial_delay=0.05,
+                            max_delay=0.2)
+        try:
+            poller.track(feed_id)
+            while not reports:
+                time.sleep(0.05)
+        finally:
+            poller.stop()
+        seconds = time.perf_counter() - start
+        requests = sum(stats["requests"] for stats in sim.snapshot().values())
+        return [{
+            "skus": skus,
+            "tls": tls,
+            "seconds": round(seconds, 3),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "requests": requests,
+            "connections": sum(sim.connections.values()),
+            "requests_per_connection": round(requests / max(1, sum(sim.connections.values())), 1),
+            **{f"connections_{service}": count for service, count in sim.connections.items()}
+        }]
+
+
+# === THROTTLING ===
+
+def bench_throttling(rate_scales=(10, 50, 200), calls=120, threads=8):
+    """
+    createFeedDocument throughput against the simulator's usage plan (0.5/s x rate_scale, burst 15), with the
+    adaptive scheduler on and off (off = the client assumes 1000x the documented rate).
+    """
+    rows = []
+    for rate_scale in rate_scales:
+        for scheduled in (True, False):
+            with simulated(rate_scale) as sim:
+                if not scheduled:
+                    http_client.SCHEDULER = RequestScheduler(rate_scale=rate_scale * 1000)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(threads) as pool:
+                    statuses = list(pool.map(
+                        lambda _: http_client.post(f"{sim.url('sp_api')}/feeds/2021-06-30/documents",
+                                                   json={"contentType": "text/plain"}).status_code,
+                        range(calls)
+                    ))
+                seconds = time.perf_counter() - start
+                rows.append({
+                    "limit_per_second": 0.5 * rate_scale,
+                    "scheduler": scheduled,
+                    "achieved_per_second": round(sum(1 for s in statuses if s < 400) / seconds, 2),
+                    "throttled_429s": _throttled(sim),
+                    "failed_calls": sum(1 for s in statuses if s >= 400)
+                })
+    return rows
+
+
+# === SHOPIFY BULK VS REST ===
+
+def bench_shopify_bulk(sizes=(40, 120), latency=0.05, rate_scale=1):
+    """
+    Products per minute through one REST call per design vs a GraphQL bulk operation, at Shopify's
+    documented leaky bucket (rate_scale=1).
+    """
+    rows = []
+    for size in sizes:
+        row = {"designs": size}
+        with simulated(rate_scale, latency=latency, processing_time=1.0):
+            start = time.perf_counter()
+            results = list(run_designs(list(range(size)), lambda i: upload_and_create_shopify_product(
+                BytesIO(make_png(i, 16)), f"rest-{i}", f"Rest {i}", SECRETS["SHOPIFY_STORE"],
+                SECRETS["SHOPIFY_TOKEN"], "sim"
+            )))
+            seconds = time.perf_counter() - start
+            row["rest_products_per_minute"] = round(sum(r["ok"] for r in results) * 60 / seconds)
+        with simulated(rate_scale, latency=latency, processing_time=1.0):
+            start = time.perf_counter()
+            images = list(run_designs(list(range(size)), lambda i: upload_image_to_imgbb(
+                BytesIO(make_png(i, 16)), f"bulk-{i}", "sim"
+            )))
+            designs = [{"handle": f"bulk-{r['design']}", "title_full": f"Bulk {r['design']}", "image_url": r["result"]}
+                       for r in images if r["ok"]]
+            results = bulk_create_products(designs, SECRETS["SHOPIFY_STORE"], SECRETS["SHOPIFY_TOKEN"],
+                                           poll_interval=0.2)
+            seconds = time.perf_counter() - start
+            row["bulk_products_per_minute"] = round(sum(1 for r in results if not r["error"]) * 60 / seconds)
+        rows.append(row)
+    return rows
+
+
+# === LWA TOKEN REFRESHES ===
+
+def bench_lwa(hours=24, calls_per_minute=60):
+    """
+    Token endpoint calls made by one TokenCache over a simulated run of the given length.
+    """
+    now = [0.0]
+    with simulated() as sim:
+        cache = TokenCache("sim", "sim", "sim", background=False, clock=lambda: now[0])
+        calls = 0
+        while now[0] < hours * 3600:
+            cache.get()
+            calls += 1
+            now[0] += 60 / calls_per_minute
+        return [{"hours": hours, "token_uses": calls, "refreshes": cache.refresh_count,
+                 "token_requests": sim.snapshot()["lwaToken"]["requests"]}]
+
+
+# === GENERATORS AND LOCAL STORES ===
+
+# The listing generator as it was before the precompiled catalog, kept verbatim (apart from taking the slug and
+# seller ID as arguments) so bench_generation can compare old and new on the same machine.
+LEGACY_DESCRIPTION = get_catalog().line().description
+LEGACY_BULLETS = list(get_catalog().line().bullets)
+
+
+def _legacy_generate_amazon_json_feed(title, image_url, seller_id, slug=None):
+
+    variations = [
+        "Newborn White Short Sleeve", "Newborn White Long Sleeve", "Newborn Natural Short Sleeve",
+        "0-3M White Short Sleeve", "0-3M White Long Sleeve", "0-3M Pink Short Sleeve", "0-3M Blue Short Sleeve",
+        "3-6M White Short Sleeve", "3-6M White Long Sleeve", "3-6M Blue Short Sleeve", "3-6M Pink Short Sleeve",
+        "6M Natural Short Sleeve", "6-9M White Short Sleeve", "6-9M White Long Sleeve", "6-9M Pink Short Sleeve",
+        "6-9M Blue Short Sleeve", "12M White Short Sleeve", "12M White Long Sleeve", "12M Natural Short Sleeve",
+        "12M Pink Short Sleeve", "12M Blue Short Sleeve", "18M White Short Sleeve", "18M White Long Sleeve",
+        "18M Natural Short Sleeve", "24M White Short Sleeve", "24M White Long Sleeve", "24M Natural Short Sleeve"
+    ]
+
+    def format_slug(title):
+        slug = ''.join([w[0] for w in title.split() if w]).upper()[:3]
+        return f"{slug}-{random.randint(1000, 9999)}"
+
+    def format_variation_sku(slug, variation):
+        parts = variation.split()
+        size = parts[0].replace("Newborn", "NB").replace("0-3M", "03M").replace("3-6M", "36M") \
+                       .replace("6-9M", "69M").replace("6M", "06M").replace("12M", "12M") \
+                       .replace("18M", "18M").replace("24M", "24M")
+        color = parts[1][0].upper()
+        sleeve = "SS" if "Short" in variation else "LS"
+        return f"{slug}-{size}-{color}-{sleeve}"
+
+    def extract_color_and_sleeve(variation):
+        color_map = "White"
+        sleeve_type = "Short Sleeve" if "Short" in variation else "Long Sleeve"
+        for word in variation.split():
+            if word.lower() in ["white", "pink", "blue", "natural"]:
+                color_map = word.capitalize()
+        return color_map, sleeve_type
+
+    slug = slug or format_slug(title)
+
+    price_map = {
+        "Newborn White Short Sleeve": 21.99,
+        "Newborn White Long Sleeve": 22.99,
+        "Newborn Natural Short Sleeve": 27.99,
+        "0-3M White Short Sleeve": 21.99,
+        "0-3M White Long Sleeve": 22.99,
+        "0-3M Pink Short Sleeve": 27.99,
+        "0-3M Blue Short Sleeve": 27.99,
+        "3-6M White Short Sleeve": 21.99,
+        "3-6M White Long Sleeve": 22.99,
+        "3-6M Blue Short Sleeve": 27.99,
+        "3-6M Pink Short Sleeve": 27.99,
+        "6M Natural Short Sleeve": 27.99,
+        "6-9M White Short Sleeve": 21.99,
+        "6-9M White Long Sleeve": 22.99,
+        "6-9M Pink Short Sleeve": 27.99,
+        "6-9M Blue Short Sleeve": 27.99,
+        "12M White Short Sleeve": 21.99,
+        "12M White Long Sleeve": 22.99,
+        "12M Natural Short Sleeve": 27.99,
+        "12M Pink Short Sleeve": 27.99,
+        "12M Blue Short Sleeve": 27.99,
+        "18M White Short Sleeve": 21.99,
+        "18M White Long Sleeve": 22.99,
+        "18M Natural Short Sleeve": 27.99,
+        "24M White Short Sleeve": 21.99,
+        "24M White Long Sleeve": 22.99,
+        "24M Natural Short Sleeve": 27.99
+    }
+
+    parent_sku = f"{slug}-PARENT"
+
+    messages = [{
+        "messageId": 1,
+        "sku": parent_sku,
+        "operationType": "UPDATE",
+        "productType": "LEOTARD",
+        "requirements": "LISTING",
+        "attributes": {
+            "item_name": [{"value": f"{title} - Baby Boy Girl Clothes Bodysuit Funny Cute"}],
+            "brand": [{"value": "NOFO VIBES"}],
+            "item_type_keyword": [{"value": "infant-and-toddler-bodysuits"}],
+            "product_description": [{"value": LEGACY_DESCRIPTION}],
+            "bullet_point": [{"value": b} for b in LEGACY_BULLETS],
+            "target_gender": [{"value": "female"}],
+            "age_range_description": [{"value": "Infant"}],
+            "material": [{"value": "Cotton"}],
+            "department": [{"value": "Baby Girls"}],
+            "variation_theme": [{"name": "SIZE/COLOR"}],
+            "parentage_level": [{"value": "parent"}],
+            "model_number": [{"value": "NBV"}],
+            "model_name": [{"value": title}],
+            "import_designation": [{"value": "Imported"}],
+            "country_of_origin": [{"value": "US"}],
+            "condition_type": [{"value": "new_new"}],
+            "batteries_required": [{"value": False}],
+            "fabric_type": [{"value": "100% cotton"}],
+            "supplier_declared_dg_hz_regulation": [{"value": "not_applicable"}],
+            "supplier_declared_has_product_identifier_exemption": [{"value": True}]
+        }
+    }]
+
+    for idx, variation in enumerate(variations, start=2):
+        sku = format_variation_sku(slug, variation)
+        color_map, sleeve_type = extract_color_and_sleeve(variation)
+
+        other_product_images = {
+            f"other_product_image_locator_{i+1}": [{
+                "media_location": [
+                    "https://cdn.shopify.com/s/files/1/0545/2018/5017/files/ca9082d9-c0ef-4dbc-a8a8-0de85b9610c0-copy.jpg?v=1744051115",
+                    "https://cdn.shopify.com/s/files/1/0545/2018/5017/files/26363115-65e5-4936-b422-aca4c5535ae1-copy.jpg?v=1744051115",
+                    "https://cdn.shopify.com/s/files/1/0545/2018/5017/files/a050c7dc-d0d5-4798-acdd-64b5da3cc70c-copy.jpg?v=1744051115"
+                ][i % 3],
+                "marketplace_id": "ATVPDKIKX0DER"
+            }] for i in range(5)
+        }
+
+        attributes = {
+            "item_name": [{"value": f"{title} - Baby Boy Girl Clothes Bodysuit Funny Cute"}],
+            "brand": [{"value": "NOFO VIBES"}],
+            "item_type_keyword": [{"value": "infant-and-toddler-bodysuits"}],
+            "product_description": [{"value": LEGACY_DESCRIPTION}],
+            "bullet_point": [{"value": b} for b in LEGACY_BULLETS],
+            "target_gender": [{"value": "female"}],
+            "age_range_description": [{"value": "Infant"}],
+            "material": [{"value": "Cotton"}],
+            "department": [{"value": "Baby Girls"}],
+            "variation_theme": [{"name": "SIZE/COLOR"}],
+            "parentage_level": [{"value": "child"}],
+            "child_parent_sku_relationship": [{
+                "child_relationship_type": "variation",
+                "parent_sku": parent_sku
+            }],
+            "size": [{"value": variation}],
+            "style": [{"value": sleeve_type}],
+            "model_number": [{"value": "NBV"}],
+            "model_name": [{"value": "Crew Neck Bodysuit"}],
+            "import_designation": [{"value": "Made in USA"}],
+            "country_of_origin": [{"value": "US"}],
+            "condition_type": [{"value": "new_new"}],
+            "batteries_required": [{"value": False}],
+            "fabric_type": [{"value": "100% cotton"}],
+            "supplier_declared_dg_hz_regulation": [{"value": "not_applicable"}],
+            "supplier_declared_has_product_identifier_exemption": [{"value": True}],
+            "care_instructions": [{"value": "Machine Wash"}],
+            "sleeve": [{"value": sleeve_type}],
+            "color": [{"value": "multi"}],
+            "list_price": [{"currency": "USD", "value": price_map[variation]}],
+                        "item_package_dimensions": [{
+                "length": {"value": 3, "unit": "inches"},
+                "width": {"value": 3, "unit": "inches"},
+                "height": {"value": 1, "unit": "inches"}
+            }],
+            "item_package_weight": [{"value": 0.19, "unit": "kilograms"}],
+            "main_product_image_locator": [{
+                "media_location": image_url,
+                "marketplace_id": "ATVPDKIKX0DER"
+            }],
+            **other_product_images,
+            "purchasable_offer": [{
+                "currency": "USD",
+                "our_price": [{"schedule": [{"value_with_tax": price_map[variation]}]}],
+                "marketplace_id": "ATVPDKIKX0DER"
+            }],
+            "fulfillment_availability": [{
+                "quantity": 999,
+                "fulfillment_channel_code": "DEFAULT",
+                "marketplace_id": "ATVPDKIKX0DER"
+            }]
+        }
+
+        messages.append({
+            "messageId": idx,
+            "sku": sku,
+            "operationType": "UPDATE",
+            "productType": "LEOTARD",
+            "requirements": "LISTING",
+            "attributes": attributes
+        })
+
+    return json.dumps({
+        "header": {
+            "sellerId": seller_id,
+            "version": "2.0",
+            "issueLocale": "en_US"
+        },
+        "messages": messages
+    }, indent=2)
+
+
+def _legacy_messages(title, image_url, slug):
+    # the old multi-file path parsed each design's JSON text back into messages before merging
+    return json.loads(_legacy_generate_amazon_json_feed(title, image_url, SECRETS["SELLER_ID"], slug))["messages"]
+
+
+def _generation_row(name, generate, designs):
+    start = time.perf_counter()
+    messages = [m for i in range(designs) for m in generate(f"Design {i}", "https://img", f"D-{i}")]
+    seconds = time.perf_counter() - start
+
+    # peak is everything allocated along the way, retained is what one design's messages keep alive
+    tracemalloc.start()
+    result = generate("Design", "https://img", "D-1")
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del result
+    return messages, {
+        "generator": name,
+        "designs": designs,
+        "ms_per_design": round(seconds * 1000 / designs, 3),
+        "peak_kb_per_design": round(peak / 1024, 1),
+        "retained_kb_per_design": round(retained / 1024, 1),
+        "retained_blocks_per_design": blocks
+    }
+
+
+def bench_generation(designs=1000):
+    """
+    Per-design listing message generation time and allocations for the old generator (JSON text parsed back
+    into messages) and the precompiled one side by side, and streaming the result into a feed document.
+    """
+    legacy_messages, legacy = _generation_row("old", _legacy_messages, designs)
+    messages, current = _generation_row("new", generate_listing_messages, designs)
+    # templates hold tuples and keys come in another order, so compare the decoded JSON of each message
+    identical = len(legacy_messages) == len(messages) and all(
+        old == json.loads(json.dumps(new)) for old, new in zip(legacy_messages, messages)
+    )
+    del legacy_messages
+
+    start = time.perf_counter()
+    feed = write_feed(SECRETS["SELLER_ID"], messages)
+    write_seconds = time.perf_counter() - start
+    feed.seek(0, os.SEEK_END)
+    current.update(speedup=round(legacy["ms_per_design"] / current["ms_per_design"], 1), identical_output=identical,
+                   feed_mb=round(feed.tell() / 1024 / 1024, 1),
+                   write_mb_per_second=round(feed.tell() / 1024 / 1024 / write_seconds, 1))
+    return [legacy, current]
+
+
+def bench_catalog(lines=40, variations=100, lookups=100000):
+    """
+    Loading a catalog directory with many product lines and looking up variations by name and SKU.
+    """
+    with tempfile.TemporaryDirectory() as catalog_dir:
+        for line in range(lines):
+            sizes = [f"S{s}" for s in range(variations // 4 + 1)]
+            spec = {
+                "name": f"line-{line}", "brand": "SIM", "marketplace_id": SECRETS["MARKETPLACE_ID"],
+                "product_type": "SHIRT", "item_name_suffix": "Shirt", "description": "<p>Sim</p>",
+                "bullets": ["One", "Two"], "other_image_urls": ["https://img/1"], "other_image_slots": 5,
+                "size_codes": {s: s for s in sizes}, "color_codes": {c: c[0] for c in ("Red", "Blue")},
+                "sleeve_codes": {"Short Sleeve": "SS", "Long Sleeve": "LS"},
+                "attributes": {"common": {"material": [{"value": "Cotton"}]}},
+                "variations": [
+                    {"size": sizes[v // 4], "color": ("Red", "Blue")[v % 2],
+                     "sleeve": ("Short Sleeve", "Long Sleeve")[v // 2 % 2], "price": 20 + v % 7}
+                    for v in range(variations)
+                ]
+            }
+            with open(os.path.join(catalog_dir, f"line_{line}.json"), "w") as f:
+                json.dump(spec, f)
+        start = time.perf_counter()
+        catalog = load_catalog(catalog_dir)
+        load_seconds = time.perf_counter() - start
+
+    names = catalog.names()
+    targets = [catalog.line(name).variations[i % variations] for i, name in enumerate(names * (lookups // len(names)))]
+    start = time.perf_counter()
+    for i, variation in enumerate(targets):
+        catalog.line(names[i % len(names)]).by_name[variation["name"]]
+    name_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for i, variation in enumerate(targets):
+        catalog.line(names[i % len(names)]).variation_for_sku(f"ABC-1234-{variation['sku_suffix']}")
+    sku_seconds = time.perf_counter() - start
+    return [{
+        "lines": lines,
+        "variations": lines * variations,
+        "load_ms": round(load_seconds * 1000, 1),
+        "name_lookups_per_second": round(len(targets) / name_seconds),
+        "sku_lookups_per_second": round(len(targets) / sku_seconds)
+    }]
+
+
+def bench_reports(issues=100000, feeds=10):
+    """
+    Ingesting processing reports with the given total number of issues, then the app's typical queries.
+    """
+    per_feed = issues // feeds
+    with tempfile.TemporaryDirectory() as workdir:
+        store = ReportStore(os.path.join(workdir, "reports.db"))
+        start = time.perf_counter()
+        for feed in range(feeds):
+            feed_id = f"F{feed}"
+            store.register_feed(feed_id, [f"SKU-{feed}-{m}" for m in range(per_feed)])
+            store.ingest_report(feed_id, json.dumps({"issues": [
+                {"messageId": m + 1, "code": str(90000 + m % 50), "severity": ("ERROR", "WARNING")[m % 2],
+                 "attributeName": ("item_name", "main_product_image_locator")[m % 3 == 0], "message": "x"}
+                for m in range(per_feed)
+            ], "summary": {"messagesProcessed": per_feed}}))
+        ingest_seconds = time.perf_counter() - start
+        queries = {
+            "errors_last_10_feeds": lambda: store.query_issues(severity="ERROR", last_feeds=10),
+            "image_locator_skus": lambda: store.failing_skus(attribute_like="image_locator"),
+            "one_sku": lambda: store.query_issues(sku="SKU-3-42")
+        }
+        row = {"issues": per_feed * feeds, "ingest_seconds": round(ingest_seconds, 2)}
+        for name, query in queries.items():
+            start = time.perf_counter()
+            query()
+            row[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return [row]
+
+
+def bench_image_prep(count=16, side=4000):
+    """
+    Per-core image preparation throughput and bytes saved on the wire, on a set of large noisy PNGs.
+    """
+    files = [(f"large-{i}.png", make_noisy_png(i, side)) for i in range(count)]
+    rows = []
+    for max_workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        prepared = prepare_images(files, max_workers=max_workers)
+        seconds = time.perf_counter() - start
+        rows.append({
+            "images": count,
+            "workers": max_workers,
+            "images_per_second": round(count / seconds, 2),
+            "images_per_second_per_core": round(count / seconds / max_workers, 2),
+            "original_mb": round(sum(p["original_bytes"] for p in prepared) / 1024 / 1024, 1),
+            "payload_mb": round(sum(p["payload_bytes"] for p in prepared) / 1024 / 1024, 1)
+        })
+    return rows
+
+
+BENCHMARKS = {
+    "pipeline": bench_pipeline,
+    "inventory": bench_inventory,
+    "concurrency": bench_concurrency,
+    "connections": bench_connections,
+    "throttling": bench_throttling,
+    "shopify_bulk": bench_shopify_bulk,
+    "lwa": bench_lwa,
+    "generation": bench_generation,
+    "catalog": bench_catalog,
+    "reports": bench_reports,
+    "image_prep": bench_image_prep
+}
+
+
+def print_rows(name, rows):
+    print(f"\n== {name} ==")
+    for row in rows:
+        print("  " + "  ".join(f"{key}={value}" for key, value in row.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against the local API simulator.")
+    parser.add_argument("benchmark", choices=[*BENCHMARKS, "all"])
+    parser.add_argument("--sizes", type=int, nargs="+", help="batch sizes for pipeline, inventory, "
+                                                             "concurrency and shopify_bulk")
+    parser.add_argument("--latency", type=float, help="simulated per-request latency in seconds")
+    parser.add_argument("--bulk-shopify", action="store_true", help="run the pipeline with Shopify bulk mode")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    results = {}
+    for name in names:
+        options = {}
+        if args.sizes and name in ("pipeline", "inventory", "concurrency", "shopify_bulk"):
+            options["sizes"] = args.sizes
+        if args.latency is not None and name in ("pipeline", "inventory", "concurrency", "connections", "shopify_bulk"):
+            options["latency"] = args.latency
+        if name == "pipeline":
+            options["bulk_shopify"] = args.bulk_shopify
+        results[name] = BENCHMARKS[name](**options)
+        print_rows(name, results[name])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import os
+
+# Base URLs of every external service. Each can be overridden with an environment variable of the same name
+# or with configure(), e.g. to point the whole pipeline at a local simulator.Simulator.
+DEFAULTS = {
+    "SP_API_BASE_URL": "https://sellingpartnerapi-na.amazon.com",
+    "LWA_TOKEN_URL": "https://api.amazon.com/auth/o2/token",
+    "IMGBB_UPLOAD_URL": "https://api.imgbb.com/1/upload",
+    "SHOPIFY_BASE_URL": "https://{store}"  # {store} is the SHOPIFY_STORE domain
+}
+FEEDS_API_VERSION = "2021-06-30"
+
+_overrides = {}
+
+
+def url(name):
+    if name not in DEFAULTS:
+        raise KeyError(f"Unknown endpoint: {name}")
+    return _overrides.get(name) or os.environ.get(name) or DEFAULTS[name]
+
+
+def configure(**urls):
+    """
+    Overrides endpoint base URLs for this process, e.g. configure(SP_API_BASE_URL="http://127.0.0.1:8000").
+    Passing None restores the environment/default value.
+    """
+    for name, value in urls.items():
+        if name not in DEFAULTS:
+            raise KeyError(f"Unknown endpoint: {name}")
+        if value is None:
+            _overrides.pop(name, None)
+        else:
+            _overrides[name] = value.rstrip("/")
+
+
+def reset():
+    _overrides.clear()
+
+
+def feeds_url():
+    return f"{url('SP_API_BASE_URL')}/feeds/{FEEDS_API_VERSION}"
+
+
+def shopify_admin_url(shopify_store, api_version, resource):
+    return f"{url('SHOPIFY_BASE_URL').format(store=shopify_store)}/admin/api/{api_version}/{resource}"
@@ -0,0 +1,173 @@
+import heapq
+import random
+import threading
+import time
+
+import sp_api
+from lwa_token import resolve_access_token
+
+INITIAL_DELAY = 30  # seconds before the first status check; feeds are never done sooner
+MAX_DELAY = 600
+BACKOFF_MULTIPLIER = 1.5
+JITTER = 0.2  # +/- fraction applied to every delay
+DEFAULT_RATE = 2.0  # getFeed requests per second when the response carries no rate-limit header
+MAX_CLIENT_ERRORS = 3  # consecutive 4xx responses (other than 429) before a feed is given up
+GAVE_UP = "POLL_FAILED"  # our own status for a feed that getFeed keeps rejecting
+TERMINAL_STATUSES = {"DONE", "CANCELLED", "FATAL", GAVE_UP}
+
+
+class FeedPoller:
+    """
+    Polls many feeds from one background thread until each reaches a terminal status.
+
+    Each feed backs off exponentially with jitter while it is IN_QUEUE or IN_PROGRESS.
+    getFeed calls are spaced according to the x-amzn-RateLimit-Limit header, and a 429 response
+    is retried after its Retry-After delay. When a feed finishes, its processing report is
+    downloaded and on_report(feed_id, report_text) is called.
+    Other errors are retried with the same backoff, except that a feed whose getFeed call fails with a
+    non-retryable 4xx (403, 404, ...) max_client_errors times in a row is given up with status POLL_FAILED.
+    """
+
+    def __init__(self, access_token, on_report=None, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY,
+                 multiplier=BACKOFF_MULTIPLIER, jitter=JITTER, max_client_errors=MAX_CLIENT_ERRORS,
+                 clock=time.monotonic):
+        self.access_token = access_token
+        self.on_report = on_report
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_client_errors = max_client_errors
+        self.clock = clock
+        self._feeds = {}
+        self._queue = []
+        self._min_interval = 1 / DEFAULT_RATE
+        self._last_call = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _jittered(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, feed_id, delay):
+        state = self._feeds[feed_id]
+        state["next_check"] = self.clock() + delay
+        heapq.heappush(self._queue, (state["next_check"], feed_id))
+        self._cond.notify()
+
+    def track(self, feed_id):
+        """
+        Starts polling feed_id. Tracking a feed that is already known is a no-op.
+        """
+        with self._cond:
+            if feed_id in self._feeds:
+                return
+            self._feeds[feed_id] = {
+                "status": "SUBMITTED", "checks": 0, "client_errors": 0, "delay": self.initial_delay,
+                "next_check": None, "report": None, "error": None, "updated_at": time.time()
+            }
+            self._schedule(feed_id, self._jittered(self.initial_delay))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def snapshot(self, feed_ids=None):
+        """
+        Returns a copy of the tracked state, optionally limited to feed_ids.
+        """
+        with self._cond:
+            ids = self._feeds.keys() if feed_ids is None else [f for f in feed_ids if f in self._feeds]
+            now = self.clock()
+            result = {}
+            for feed_id in ids:
+                state = dict(self._feeds[feed_id])
+                next_check = state.pop("next_check")
+                state.pop("delay")
+                state["next_check_in"] = None if next_check is None else max(0, round(next_check - now))
+                result[feed_id] = state
+            return result
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _next_due(self):
+        with self._cond:
+            while not self._stopped:
+                if self._queue:
+                    due, feed_id = self._queue[0]
+                    wait = due - self.clock()
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        # stale entries are left behind when a feed is rescheduled
+                        if self._feeds[feed_id]["next_check"] == due:
+                            return feed_id
+                        continue
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _run(self):
+        while True:
+            feed_id = self._next_due()
+            if feed_id is None:
+                return
+            wait = self._last_call + self._min_interval - self.clock()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_call = self.clock()
+            try:
+                self._check(feed_id)
+            except Exception as e:
+                self._failed(feed_id, e)
+
+    def _failed(self, feed_id, error):
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+        with self._cond:
+            state = self._feeds[feed_id]
+            state.update(error=str(error), updated_at=time.time())
+            if status_code is not None and 400 <= status_code < 500:
+                state["client_errors"] += 1
+                if state["client_errors"] >= self.max_client_errors:
+                    state.update(status=GAVE_UP, next_check=None)
+                    return
+            else:
+                state["client_errors"] = 0
+            state["delay"] = min(self.max_delay, state["delay"] * self.multiplier)
+            self._schedule(feed_id, self._jittered(state["delay"]))
+
+    def _check(self, feed_id):
+        token = resolve_access_token(self.access_token)
+        res = sp_api.get_feed_response(feed_id, token)
+        rate = res.headers.get("x-amzn-RateLimit-Limit")
+        if rate:
+            self._min_interval = 1 / max(float(rate), 0.001)
+        if res.status_code == 429:
+            retry_after = float(res.headers.get("Retry-After", self.max_delay / 10))
+            with self._cond:
+                self._feeds[feed_id]["error"] = "Throttled by SP-API"
+                self._schedule(feed_id, retry_after)
+            return
+        res.raise_for_status()
+        feed_status = res.json()
+        status = feed_status.get("processingStatus", "UNKNOWN")
+
+        with self._cond:
+            state = self._feeds[feed_id]
+            state.update(status=status, checks=state["checks"] + 1, client_errors=0, error=None,
+                         updated_at=time.time())
+            if status not in TERMINAL_STATUSES:
+                state["delay"] = min(self.max_delay, state["delay"] * self.multiplier)
+                self._schedule(feed_id, self._jittered(state["delay"]))
+                return
+            state["next_check"] = None
+
+        if feed_status.get("resultFeedDocumentId"):
+            report = sp_api.download_processing_report(feed_status, token)
+            with self._cond:
+                self._feeds[feed_id]["report"] = report
+            if self.on_report:
+                self.on_report(feed_id, report)
@@ -0,0 +1,100 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import tracing
+
+# JSON_LISTINGS_FEED limits; lower them to keep feeds small enough to process quickly
+MAX_FEED_MESSAGES = 10000
+MAX_FEED_BYTES = 10 * 1024 * 1024
+HEADER_BYTES = 256  # room for the feed header and the surrounding document syntax
+DEFAULT_MAX_WORKERS = 4
+
+
+def _parent_sku(message):
+    relationship = message.get("attributes", {}).get("child_parent_sku_relationship")
+    if relationship:
+        return relationship[0]["parent_sku"]
+    return message["sku"]
+
+
+def group_messages(messages):
+    """
+    Groups messages into families: a parent SKU followed by all of its children.
+    Families keep the order in which they first appear.
+    """
+    families = {}
+    for message in messages:
+        families.setdefault(_parent_sku(message), []).append(message)
+    return list(families.values())
+
+
+@tracing.traced("feed_sharding.shard_messages", stage="feed_generation")
+def shard_messages(messages, max_bytes=MAX_FEED_BYTES, max_messages=MAX_FEED_MESSAGES):
+    """
+    Splits messages into shards that each fit within max_bytes and max_messages once encoded.
+    A parent and its children always land in the same shard.
+    Each shard's messages are renumbered from 1; the input messages are not modified.
+    """
+    encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def id_bytes(first_id, count):
+        return sum(len(str(message_id)) for message_id in range(first_id, first_id + count))
+
+    shards = []
+    current, current_bytes = [], HEADER_BYTES
+    for family in group_messages(messages):
+        # sized without the digits of its messageId (plus the separator); those are added for the ids the
+        # family will actually carry, which run well past its original 1-28 once the shard is renumbered
+        base_bytes = sum(len(encoder.encode({**m, "messageId": 0}).encode("utf-8")) for m in family)
+        if len(family) > max_messages or HEADER_BYTES + base_bytes + id_bytes(1, len(family)) > max_bytes:
+            raise ValueError(f"SKU family {_parent_sku(family[0])} does not fit in a single feed")
+        family_bytes = base_bytes + id_bytes(len(current) + 1, len(family))
+        if current and (len(current) + len(family) > max_messages or current_bytes + family_bytes > max_bytes):
+            shards.append(current)
+            current, current_bytes = [], HEADER_BYTES
+            family_bytes = base_bytes + id_bytes(1, len(family))
+        current.extend(family)
+        current_bytes += family_bytes
+    if current:
+        shards.append(current)
+    return [[{**m, "messageId": idx} for idx, m in enumerate(shard, start=1)] for shard in shards]
+
+
+def submit_shards(shards, submit_shard, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Submits already built shards in parallel with submit_shard(shard_messages) -> feedId.
+    Yields (shard_index, feedId, error) as each submission finishes, so callers can checkpoint shard by shard.
+    """
+    if not shards:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(shards))) as pool:
+        submit_shard = tracing.wrap(submit_shard)
+        futures = {pool.submit(submit_shard, shard): idx for idx, shard in enumerate(shards)}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+
+
+def submit_sharded(messages, submit_shard, max_bytes=MAX_FEED_BYTES, max_messages=MAX_FEED_MESSAGES,
+                   max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Shards messages and submits every shard in parallel with submit_shard(shard_messages) -> feedId.
+
+    Returns a manifest:
+    {
+        "feeds": [{"feedId", "skus", "error"}, ...],  # skus[i] is the SKU of messageId i + 1
+        "skus": {sku: feedId or None if its shard failed}
+    }
+    """
+    shards = shard_messages(messages, max_bytes, max_messages)
+    results = {idx: (feed_id, error) for idx, feed_id, error in submit_shards(shards, submit_shard, max_workers)}
+    manifest = {"feeds": [], "skus": {}}
+    for idx, shard in enumerate(shards):
+        feed_id, error = results[idx]
+        skus = [m["sku"] for m in shard]
+        manifest["feeds"].append({"feedId": feed_id, "skus": skus, "error": error})
+        for sku in skus:
+            manifest["skus"][sku] = feed_id
+    return manifest
@@ -0,0 +1,55 @@
+import gzip
+import json
+import tempfile
+
+import tracing
+
+SPOOL_MAX_SIZE = 8 * 1024 * 1024  # keep small feeds in memory, spill bigger ones to disk
+
+
+class FeedWriter:
+    """
+    Encodes a JSON_LISTINGS_FEED document one message at a time into a spooled temp file,
+    so only the message being written is ever held as encoded text.
+
+    writer = FeedWriter(seller_id)
+    writer.write_messages(messages)
+    feed_file = writer.close()  # positioned at 0, ready to stream
+    """
+
+    def __init__(self, seller_id, compress=False, spool_max_size=SPOOL_MAX_SIZE):
+        self.compress = compress
+        self.message_count = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        self._out = gzip.GzipFile(fileobj=self.file, mode="wb") if compress else self.file
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+        header = {"sellerId": seller_id, "version": "2.0", "issueLocale": "en_US"}
+        self._write('{"header":' + self._encoder.encode(header) + ',"messages":[')
+
+    def _write(self, text):
+        self._out.write(text.encode("utf-8"))
+
+    def write_message(self, message):
+        self._write(("," if self.message_count else "") + self._encoder.encode(message))
+        self.message_count += 1
+
+    def write_messages(self, messages):
+        for message in messages:
+            self.write_message(message)
+
+    def close(self):
+        self._write("]}")
+        if self.compress:
+            self._out.close()
+        self.file.seek(0)
+        return self.file
+
+
+@tracing.traced("feed_writer.write_feed", stage="feed_generation")
+def write_feed(seller_id, messages, compress=False):
+    """
+    Streams messages into a new feed document and returns the rewound file.
+    """
+    writer = FeedWriter(seller_id, compress=compress)
+    writer.write_messages(messages)
+    return writer.close()
@@ -0,0 +1,204 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+from rate_limiter import MAX_RETRIES, RETRY_STATUSES, RequestScheduler, retry_delay
+
+# (connect, read) seconds; requests waits forever when no timeout is given
+DEFAULT_TIMEOUT = (10, 120)
+POOL_CONNECTIONS = 10  # number of hosts kept in the pool manager
+POOL_MAXSIZE = 16  # keep-alive connections kept per host
+DEFAULT_PER_HOST_LIMIT = 4
+
+
+class HostLimiter:
+    """
+    Caps the number of in-flight requests per host so a large batch doesn't hammer a single API.
+    """
+
+    def __init__(self, per_host_limit=DEFAULT_PER_HOST_LIMIT, overrides=None):
+        self.per_host_limit = per_host_limit
+        self.overrides = dict(overrides or {})
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.overrides.get(host, self.per_host_limit))
+                self._semaphores[host] = sem
+            return sem
+
+    @contextmanager
+    def limit(self, url):
+        sem = self._semaphore(urlparse(url).netloc)
+        with sem:
+            yield
+
+
+class LatencyMetrics:
+    """
+    Thread-safe per-host request counters and latency totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def record(self, host, seconds, status):
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                "requests": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0
+            })
+            stats["requests"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if status is None or status >= 400:
+                stats["errors"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                result[host] = dict(stats, avg_seconds=stats["total_seconds"] / stats["requests"])
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+HOST_LIMITER = HostLimiter()
+METRICS = LatencyMetrics()
+SCHEDULER = RequestScheduler()
+
+_session = None
+_session_lock = threading.Lock()
+_timeout = DEFAULT_TIMEOUT
+_verify = None  # None leaves certificate checks to requests (and REQUESTS_CA_BUNDLE)
+
+
+def _new_session(pool_connections, pool_maxsize):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure(timeout=None, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, verify=None):
+    """
+    Replaces the shared session, e.g. to change pool sizes or the default timeout.
+    verify is the default certificate check for every request, e.g. the path of a test server's self-signed
+    certificate; it is passed per request because requests lets REQUESTS_CA_BUNDLE override a session's verify.
+    """
+    global _session, _timeout, _verify
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = _new_session(pool_connections, pool_maxsize)
+        _verify = verify
+        if timeout is not None:
+            _timeout = timeout
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session(POOL_CONNECTIONS, POOL_MAXSIZE)
+    return _session
+
+
+def _body_positions(kwargs):
+    # remember where file bodies start so a retried request can resend them
+    bodies = [kwargs.get("data")] + [v[1] if isinstance(v, tuple) else v for v in (kwargs.get("files") or {}).values()]
+    return [(body, body.tell()) for body in bodies if hasattr(body, "seek") and hasattr(body, "tell")]
+
+
+def _send(method, url, kwargs):
+    host = urlparse(url).netloc
+    with HOST_LIMITER.limit(url):
+        start = time.perf_counter()
+        status = None
+        try:
+            response = get_session().request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            METRICS.record(host, time.perf_counter() - start, status)
+
+
+def _payload_sizes(response, stream):
+    # Content-Length of the prepared request and of the response; streamed bodies are not read here
+    request = getattr(response, "request", None)
+    sent = int(request.headers.get("Content-Length") or 0) if request is not None else 0
+    received = response.headers.get("Content-Length")
+    if received is None and not stream:
+        received = len(response.content or b"")
+    return sent, int(received or 0)
+
+
+def request(method, url, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Sends a request through the shared keep-alive session.
+
+    Waits for the endpoint's rate-limit token first, and retries 429/503 responses after their
+    Retry-After delay (up to max_retries) instead of failing the batch.
+    Every call is traced as one http span with each attempt's status code, the retries and payload bytes.
+    Accepts the same keyword arguments as requests.request.
+    """
+    kwargs.setdefault("timeout", _timeout)
+    if _verify is not None:
+        kwargs.setdefault("verify", _verify)
+    positions = _body_positions(kwargs)
+    attempt = 0
+    with tracing.span(f"http {method}", kind="http", host=urlparse(url).netloc) as span:
+        while True:
+            SCHEDULER.acquire(method, url)
+            response = _send(method, url, kwargs)
+            SCHEDULER.observe(method, url, response)
+            sent, received = _payload_sizes(response, kwargs.get("stream"))
+            span["status_codes"].append(response.status_code)
+            span["bytes_sent"] += sent
+            span["bytes_received"] += received
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                return response
+            time.sleep(retry_delay(response, attempt))
+            attempt += 1
+            span["retries"] = attempt
+            for body, position in positions:
+                body.seek(position)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def connections_opened():
+    """
+    Returns how many TCP connections the shared session has opened, per host.
+    With keep-alive working this stays near the per-host limit no matter how many requests were sent.
+    """
+    counts = {}
+    for adapter in set(get_session().adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            counts[pool.host] = counts.get(pool.host, 0) + pool.num_connections
+    return counts
@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+import tracing
+
+# Amazon main image rules: at least 500px on the longest side (1000px enables zoom), at most 10000px
+ABSOLUTE_MIN_SIDE = 500
+ZOOM_MIN_SIDE = 1000
+MAX_SIDE = 10000
+MAX_UPLOAD_SIDE = 2560  # larger images are downscaled before upload; Amazon zoom needs no more
+THUMBNAIL_SIZE = (400, 400)
+RESAMPLABLE_MODES = ("1", "L", "LA", "P", "RGB", "RGBA")
+
+
+def _resamplable(image):
+    # 16-bit grayscale PNGs load as I;16 (or I), which thumbnail() and resize() reject; Pillow's own
+    # conversion to L clips them to white, so their values are scaled down to 8 bits instead
+    if image.mode in RESAMPLABLE_MODES:
+        return image
+    if image.mode.startswith("I"):
+        return image.convert("I").point(lambda v: v * (1 / 256)).convert("L")
+    return image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+
+
+def _encode_png(image):
+    out = BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def prepare_image(name, data):
+    """
+    Validates one PNG against Amazon's main image rules and builds a preview thumbnail plus an
+    optimized upload payload. Runs in a worker process, so it only takes and returns plain data.
+    """
+    image = Image.open(BytesIO(data))
+    image.load()
+    width, height = image.size
+    longest = max(width, height)
+
+    errors, warnings = [], []
+    if longest < ABSOLUTE_MIN_SIDE:
+        errors.append(f"{width}x{height} is below Amazon's {ABSOLUTE_MIN_SIDE}px minimum")
+    elif longest < ZOOM_MIN_SIDE:
+        warnings.append(f"{width}x{height} is below {ZOOM_MIN_SIDE}px, so Amazon zoom will be disabled")
+    if longest > MAX_SIDE:
+        errors.append(f"{width}x{height} exceeds Amazon's {MAX_SIDE}px maximum")
+
+    image = _resamplable(image)
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE)
+
+    upload = image
+    if longest > MAX_UPLOAD_SIDE:
+        scale = MAX_UPLOAD_SIDE / longest
+        upload = image.resize((round(width * scale), round(height * scale)), Image.LANCZOS)
+    payload = _encode_png(upload)
+    if upload is image and len(payload) >= len(data):
+        payload = data
+
+    return {
+        "name": name,
+        "width": width,
+        "height": height,
+        "errors": errors,
+        "warnings": warnings,
+        "thumbnail": _encode_png(thumbnail),
+        "payload": payload,
+        "original_bytes": len(data),
+        "payload_bytes": len(payload)
+    }
+
+
+def _prepare(item):
+    name, data = item
+    try:
+        return prepare_image(name, data)
+    except Exception as e:
+        return {"name": name, "errors": [f"Could not read image: {e}"], "warnings": [],
+                "thumbnail": None, "payload": None, "original_bytes": len(data), "payload_bytes": 0}
+
+
+@tracing.traced("image_prep.prepare_images", stage="image_prep")
+def prepare_images(items, max_workers=None):
+    """
+    Prepares (name, data) pairs across CPU cores and returns the results in input order.
+    """
+    items = list(items)
+    if not items:
+        return []
+    max_workers = min(max_workers or os.cpu_count() or 1, len(items))
+    if max_workers == 1:
+        return [_prepare(item) for item in items]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_prepare, items))
@@ -1,56 +1,195 @@
-import requests
+import sp_api
+import sqlite_store
+import tracing
+from lwa_token import resolve_access_token
+from feed_sharding import submit_sharded
+from product_catalog import get_catalog
 import csv
 import io
+import time
 
+DEFAULT_SNAPSHOT_PATH = "inventory_snapshot.db"
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory_snapshot (
+    sku TEXT PRIMARY KEY,
+    quantity INTEGER NOT NULL,
+    latency INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    price REAL
+);
+"""
+
+def iter_inventory_rows(skus, quantity=999, latency=2):
+    """
+    Normalizes inventory input into (sku, quantity, latency) rows.
+    skus may be a dict of {sku: quantity} or {sku: (quantity, latency)}, an iterable (including a streaming
+    generator) of (sku, quantity) or (sku, quantity, latency) tuples, or plain SKUs that all get quantity.
+    """
+    items = skus.items() if isinstance(skus, dict) else skus
+    for item in items:
+        if isinstance(item, str):
+            yield item, quantity, latency
+            continue
+        sku, value = item[0], item[1:] if len(item) > 2 else item[1]
+        if isinstance(value, (tuple, list)):
+            yield sku, value[0], value[1]
+        else:
+            yield sku, value, latency
+
+@tracing.traced("inventory.generate_inventory_feed", stage="feed_generation")
 def generate_inventory_feed(skus, quantity=999, latency=2):
     """
     Generate a flat file TSV inventory feed for Amazon with quantity and fulfillment latency (handling time).
+    skus accepts anything iter_inventory_rows does.
     """
     output = io.StringIO()
     writer = csv.writer(output, delimiter='\t')
     writer.writerow(["sku", "quantity", "fulfillment_latency"])
-    for sku in skus:
-        writer.writerow([sku, quantity, latency])
+    writer.writerows(iter_inventory_rows(skus, quantity, latency))
     return output.getvalue()
 
-def submit_inventory_feed(skus, access_token, marketplace_id, seller_id):
+class InventorySnapshot:
+    """
+    Last submitted quantity, latency and price per SKU, kept in SQLite so each run only sends what changed.
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        sqlite_store.initialize(self.path, SNAPSHOT_SCHEMA, {"inventory_snapshot": {"price": "REAL"}})
+
+    def _connect(self):
+        return sqlite_store.connect(self.path)
+
+    def changed(self, rows):
+        """
+        Returns the (sku, quantity, latency, price) rows that differ from the snapshot, in input order.
+        rows are streamed into a temporary table and joined against the snapshot inside SQLite, so the snapshot
+        is never loaded into Python. A price of None means "keep the stored price" and matches any.
+        """
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE incoming (sku TEXT NOT NULL, quantity INTEGER NOT NULL, "
+                         "latency INTEGER NOT NULL, price REAL)")
+            conn.executemany("INSERT INTO incoming (sku, quantity, latency, price) VALUES (?, ?, ?, ?)", rows)
+            return [tuple(row) for row in conn.execute(
+                "SELECT i.sku, i.quantity, i.latency, i.price FROM incoming i "
+                "LEFT JOIN inventory_snapshot s ON s.sku = i.sku "
+                "WHERE s.sku IS NULL OR s.quantity != i.quantity OR s.latency != i.latency "
+                "OR (i.price IS NOT NULL AND s.price IS NOT i.price) "
+                "ORDER BY i.rowid"
+            )]
+
+    def update(self, rows):
+        """
+        Records (sku, quantity, latency) or (sku, quantity, latency, price) rows as submitted.
+        A row without a price keeps the stored one.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO inventory_snapshot (sku, quantity, latency, price, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (sku) DO UPDATE SET quantity = excluded.quantity, latency = excluded.latency, "
+                "price = COALESCE(excluded.price, price), updated_at = excluded.updated_at",
+                [(row[0], row[1], row[2], row[3] if len(row) > 3 else None, now) for row in rows]
+            )
+
+def changed_inventory_rows(skus, snapshot, quantity=999, latency=2):
+    """
+    Returns only the rows whose quantity or latency differs from the last submitted snapshot.
+    """
+    rows = ((sku, qty, lat, None) for sku, qty, lat in iter_inventory_rows(skus, quantity, latency))
+    return [row[:3] for row in snapshot.changed(rows)]
+
+@tracing.traced("inventory.submit_inventory_feed")
+def submit_inventory_feed(skus, access_token, marketplace_id, seller_id, snapshot=None, quantity=999, latency=2):
     """
     Submits the generated inventory feed to Amazon SP-API using POST_INVENTORY_AVAILABILITY_DATA.
+    access_token may be a token string or a callable such as lwa_token.TokenCache.get.
+    With an InventorySnapshot only changed rows are sent, and None is returned when nothing changed.
     """
-    feed_content = generate_inventory_feed(skus)
+    rows = list(iter_inventory_rows(skus, quantity, latency)) if snapshot is None \
+        else changed_inventory_rows(skus, snapshot, quantity, latency)
+    if not rows:
+        return None
+    access_token = resolve_access_token(access_token)
+    feed_content = generate_inventory_feed(rows)
 
-    # Step 1: Create the feed document
-    doc_res = requests.post(
-        "https://sellingpartnerapi-na.amazon.com/feeds/2021-06-30/documents",
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        },
-        json={"contentType": "text/tab-separated-values"}
+    feed_id = sp_api.submit_feed(
+        feed_content,
+        "POST_INVENTORY_AVAILABILITY_DATA",
+        "text/tab-separated-values",
+        marketplace_id,
+        access_token
     )
-    doc_res.raise_for_status()
-    doc = doc_res.json()
-
-    # Step 2: Upload the TSV file content
-    upload = requests.put(
-        doc["url"],
-        data=feed_content.encode("utf-8"),
-        headers={"Content-Type": "text/tab-separated-values"}
-    )
-    upload.raise_for_status()
-
-    # Step 3: Submit the feed to Amazon
-    feed_res = requests.post(
-        "https://sellingpartnerapi-na.amazon.com/feeds/2021-06-30/feeds",
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        },
-        json={
-            "feedType": "POST_INVENTORY_AVAILABILITY_DATA",
-            "marketplaceIds": [marketplace_id],
-            "inputFeedDocumentId": doc["feedDocumentId"]
-        }
+    if snapshot is not None:
+        snapshot.update(rows)
+    return feed_id
+
+# === JSON_LISTINGS_FEED PATCH MODE ===
+
+@tracing.traced("inventory.generate_listings_patch_messages", stage="feed_generation")
+def generate_listings_patch_messages(rows, marketplace_id, product_type=None):
+    """
+    Builds PATCH-style JSON listings messages from (sku, quantity, latency, price) rows.
+    Only fulfillment_availability and, when price is not None, purchasable_offer are replaced;
+    no other listing attributes are sent. product_type defaults to the default catalog product line's.
+    """
+    product_type = product_type or get_catalog().line().product_type
+    messages = []
+    for idx, (sku, quantity, latency, price) in enumerate(rows, start=1):
+        patches = [{
+            "op": "replace",
+            "path": "/attributes/fulfillment_availability",
+            "value": [{
+                "fulfillment_channel_code": "DEFAULT",
+                "quantity": quantity,
+                "lead_time_to_ship_max_days": latency
+            }]
+        }]
+        if price is not None:
+            patches.append({
+                "op": "replace",
+                "path": "/attributes/purchasable_offer",
+                "value": [{
+                    "currency": "USD",
+                    "our_price": [{"schedule": [{"value_with_tax": price}]}],
+                    "marketplace_id": marketplace_id
+                }]
+            })
+        messages.append({
+            "messageId": idx,
+            "sku": sku,
+            "operationType": "PATCH",
+            "productType": product_type,
+            "patches": patches
+        })
+    return messages
+
+def changed_listing_rows(skus, prices, snapshot=None, quantity=999, latency=2):
+    """
+    Joins quantities with optional {sku: price} into (sku, quantity, latency, price) rows,
+    dropping rows identical to the snapshot. A SKU without a new price keeps its current one.
+    """
+    prices = prices or {}
+    rows = ((sku, qty, lat, prices.get(sku)) for sku, qty, lat in iter_inventory_rows(skus, quantity, latency))
+    return list(rows) if snapshot is None else snapshot.changed(rows)
+
+@tracing.traced("inventory.submit_listings_patch_feed")
+def submit_listings_patch_feed(skus, access_token, marketplace_id, seller_id, prices=None, snapshot=None,
+                               quantity=999, latency=2):
+    """
+    Sends quantity and price changes as PATCH messages in JSON_LISTINGS_FEED documents instead of the
+    legacy TSV feed. Many SKUs go into each document; documents are sharded by feed_sharding limits.
+    Returns the feed_sharding manifest, or None when nothing changed.
+    """
+    rows = changed_listing_rows(skus, prices, snapshot, quantity, latency)
+    if not rows:
+        return None
+    manifest = submit_sharded(
+        generate_listings_patch_messages(rows, marketplace_id),
+        lambda shard: sp_api.submit_json_listings_feed(shard, seller_id, marketplace_id, access_token)
     )
-    feed_res.raise_for_status()
-    return feed_res.json()["feedId"]
+    if snapshot is not None:
+        sent = {sku for sku, feed_id in manifest["skus"].items() if feed_id}
+        snapshot.update(row for row in rows if row[0] in sent)
+    return manifest
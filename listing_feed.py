@@ -0,0 +1,57 @@
+import random
+
+import tracing
+from product_catalog import get_catalog
+
+# Product lines (variations, prices, copy and attribute templates) live in product_lines/ and are compiled
+# once, here at import, into product_catalog's read-only templates and variation index.
+CATALOG = get_catalog()
+
+
+def format_slug(title):
+    slug = ''.join([w[0] for w in title.split() if w]).upper()[:3]
+    return f"{slug}-{random.randint(1000, 9999)}"
+
+
+@tracing.traced("listing_feed.generate_listing_messages", stage="feed_generation")
+def generate_listing_messages(title, image_url, slug=None, product_line=None):
+    """
+    Returns the parent + child JSON_LISTINGS_FEED messages for one design as plain dicts.
+    product_line names a catalog product line; the default is product_catalog.DEFAULT_PRODUCT_LINE.
+    Message IDs start at 1; renumber them when merging several designs into one feed.
+    """
+    line = CATALOG.line(product_line)
+    slug = slug or format_slug(title)
+    parent_sku = f"{slug}-PARENT"
+    item_name = ({"value": f"{title} - {line.item_name_suffix}"},)
+    relationship = ({"child_relationship_type": "variation", "parent_sku": parent_sku},)
+    main_image = ({"media_location": image_url, "marketplace_id": line.marketplace_id},)
+
+    messages = [{
+        "messageId": 1,
+        "sku": parent_sku,
+        "operationType": "UPDATE",
+        "productType": line.product_type,
+        "requirements": "LISTING",
+        "attributes": {
+            "item_name": item_name,
+            **line.parent_template,
+            "model_name": ({"value": title},)
+        }
+    }]
+    for idx, variation in enumerate(line.variations, start=2):
+        messages.append({
+            "messageId": idx,
+            "sku": f"{slug}-{variation['sku_suffix']}",
+            "operationType": "UPDATE",
+            "productType": line.product_type,
+            "requirements": "LISTING",
+            "attributes": {
+                "item_name": item_name,
+                **line.child_template,
+                "child_parent_sku_relationship": relationship,
+                "main_product_image_locator": main_image,
+                **variation["attributes"]
+            }
+        })
+    return messages
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import endpoints
+import http_client
+import tracing
+
+REFRESH_MARGIN = 300  # refresh this many seconds before the token expires
+RETRY_DELAY = 30  # wait before retrying a failed background refresh
+
+
+class TokenCache:
+    """
+    Caches the LWA access token until shortly before it expires.
+
+    A background timer refreshes the token REFRESH_MARGIN seconds early so callers rarely wait on the
+    token endpoint. Refreshes are serialized with a lock, so concurrent callers never stampede it.
+    Pass cache.get wherever an access token callable is accepted.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token, token_url=None,
+                 refresh_margin=REFRESH_MARGIN, background=True, clock=time.monotonic):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.token_url = token_url or endpoints.url("LWA_TOKEN_URL")
+        self.refresh_margin = refresh_margin
+        self.background = background
+        self.clock = clock
+        self.refresh_count = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _is_fresh(self):
+        return self._token is not None and self.clock() < self._expires_at - self.refresh_margin
+
+    @tracing.traced("lwa.refresh_token", stage="lwa")
+    def _fetch(self):
+        r = http_client.post(self.token_url, data={
+            "grant_type": "refresh_token",
+            "refresh_token": self.refresh_token,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        })
+        r.raise_for_status()
+        data = r.json()
+        return data["access_token"], data.get("expires_in", 3600)
+
+    def _refresh_locked(self):
+        token, expires_in = self._fetch()
+        self._token = token
+        self._expires_at = self.clock() + expires_in
+        self.refresh_count += 1
+        self._schedule(expires_in - self.refresh_margin)
+
+    def _schedule(self, delay):
+        if not self.background:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 0), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._refresh_locked()
+        except Exception:
+            # get() still refreshes on demand; try again in the background shortly
+            self._schedule(RETRY_DELAY)
+
+    def get(self):
+        """
+        Returns a valid access token, refreshing it first if it is missing or about to expire.
+        """
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            # another thread may have refreshed while we waited for the lock
+            if not self._is_fresh():
+                self._refresh_locked()
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def resolve_access_token(access_token):
+    """
+    Accepts either a token string or a callable such as TokenCache.get.
+    """
+    return access_token() if callable(access_token) else access_token
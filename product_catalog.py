@@ -0,0 +1,177 @@
+import json
+import os
+from types import MappingProxyType
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "product_lines")
+DEFAULT_PRODUCT_LINE = "baby-bodysuit"
+CATALOG_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# === COMPILED PRODUCT LINES ===
+# Catalog files are compiled once into read-only templates: the same objects are referenced from every
+# message of every design, so never mutate them.
+
+
+def _freeze(value):
+    """
+    Attribute values are tuples of entries, as SP-API expects lists; dicts inside stay plain.
+    """
+    if isinstance(value, list):
+        return tuple(value)
+    return (value,)
+
+
+def _template(attributes):
+    return {name: _freeze(value) for name, value in attributes.items()}
+
+
+class ProductLine:
+    """
+    One product line compiled from a catalog file: the parent/child attribute templates and an index of its
+    variations by name and SKU suffix. Each variation is a dict with name, size, color, sleeve, price,
+    sku_suffix and its read-only variation attributes.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec["name"]
+        self.brand = spec["brand"]
+        self.marketplace_id = spec["marketplace_id"]
+        self.product_type = spec["product_type"]
+        self.item_name_suffix = spec["item_name_suffix"]
+        self.description = spec["description"]
+        self.bullets = tuple(spec["bullets"])
+        self.shopify = MappingProxyType(dict(spec.get("shopify", {}), vendor=self.brand))
+        # design title and handle suffixes default to the Shopify product type, for catalogs written before them
+        self.title_suffix = spec.get("title_suffix") or self.shopify.get("product_type") or self.item_name_suffix
+        self.handle_suffix = spec.get("handle_suffix") or self.title_suffix.lower().replace(" ", "-")
+        self.other_image_urls = tuple(spec.get("other_image_urls", ()))
+        self.quantity = spec.get("quantity", 999)
+
+        attributes = spec.get("attributes", {})
+        common = {
+            "brand": ({"value": self.brand},),
+            "product_description": ({"value": self.description},),
+            "bullet_point": tuple({"value": b} for b in self.bullets),
+            **_template(attributes.get("common", {}))
+        }
+        self.parent_template = MappingProxyType({**common, **_template(attributes.get("parent", {}))})
+        self.child_template = MappingProxyType({
+            **common,
+            **_template(attributes.get("child", {})),
+            **{
+                f"other_product_image_locator_{i+1}": ({
+                    "media_location": self.other_image_urls[i % len(self.other_image_urls)],
+                    "marketplace_id": self.marketplace_id
+                },) for i in range(spec.get("other_image_slots", 0) if self.other_image_urls else 0)
+            },
+            "fulfillment_availability": ({
+                "quantity": self.quantity,
+                "fulfillment_channel_code": "DEFAULT",
+                "marketplace_id": self.marketplace_id
+            },)
+        })
+
+        self.variations = tuple(self._compile_variation(v) for v in spec["variations"])
+        self.by_name = MappingProxyType({v["name"]: v for v in self.variations})
+        self.by_sku_suffix = MappingProxyType({v["sku_suffix"]: v for v in self.variations})
+        if len(self.by_name) != len(self.variations) or len(self.by_sku_suffix) != len(self.variations):
+            raise ValueError(f"Product line {self.name} has duplicate variation names or SKU suffixes")
+
+    def _compile_variation(self, variation):
+        size, color, sleeve = variation["size"], variation["color"], variation["sleeve"]
+        name = variation.get("name") or f"{size} {color} {sleeve}"
+        price = variation["price"]
+        sku_suffix = variation.get("sku_suffix") or "-".join((
+            self.spec["size_codes"][size], self.spec["color_codes"][color], self.spec["sleeve_codes"][sleeve]
+        ))
+        return {
+            "name": name,
+            "size": size,
+            "color": color,
+            "sleeve": sleeve,
+            "price": price,
+            "sku_suffix": sku_suffix,
+            "attributes": MappingProxyType({
+                "size": ({"value": name},),
+                "style": ({"value": sleeve},),
+                "sleeve": ({"value": sleeve},),
+                "list_price": ({"currency": "USD", "value": price},),
+                "purchasable_offer": ({
+                    "currency": "USD",
+                    "our_price": ({"schedule": ({"value_with_tax": price},)},),
+                    "marketplace_id": self.marketplace_id
+                },),
+                **_template(variation.get("attributes", {}))
+            })
+        }
+
+    def variation_for_sku(self, sku):
+        """
+        Looks up a child SKU (<slug>-<sku_suffix>) by its suffix. Returns None for parents and unknown SKUs.
+        """
+        parts = sku.split("-")
+        for start in range(1, len(parts)):
+            variation = self.by_sku_suffix.get("-".join(parts[start:]))
+            if variation:
+                return variation
+        return None
+
+
+class ProductCatalog:
+    """
+    Every product line in a catalog directory, keyed by name.
+    """
+
+    def __init__(self, lines):
+        self.lines = MappingProxyType({line.name: line for line in lines})
+
+    def line(self, name=None):
+        name = name or DEFAULT_PRODUCT_LINE
+        try:
+            return self.lines[name]
+        except KeyError:
+            raise KeyError(f"Unknown product line: {name}") from None
+
+    def names(self):
+        return sorted(self.lines)
+
+
+def read_catalog_file(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        # YAML catalogs are optional; PyYAML is only needed when one is present
+        import yaml
+        return yaml.safe_load(f)
+
+
+def load_catalog(path=DEFAULT_CATALOG_DIR):
+    """
+    Compiles every .json/.yaml/.yml product line under path (a directory or a single file).
+    A file may hold one product line or a list of them.
+    """
+    paths = [path] if os.path.isfile(path) else [
+        os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(CATALOG_EXTENSIONS)
+    ]
+    lines = []
+    for file_path in paths:
+        spec = read_catalog_file(file_path)
+        for line_spec in spec if isinstance(spec, list) else [spec]:
+            lines.append(ProductLine(line_spec))
+    catalog = ProductCatalog(lines)
+    if len(catalog.lines) != len(lines):
+        raise ValueError(f"Duplicate product line names in {path}")
+    return catalog
+
+
+_catalog = None
+
+
+def get_catalog():
+    """
+    The catalog from DEFAULT_CATALOG_DIR (or $PRODUCT_CATALOG_DIR), loaded on first use and shared afterwards.
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog(os.environ.get("PRODUCT_CATALOG_DIR") or DEFAULT_CATALOG_DIR)
+    return _catalog
@@ -0,0 +1,164 @@
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import endpoints
+
+MAX_RETRIES = 5
+BASE_BACKOFF = 1.0  # seconds; doubled on every retry without a Retry-After header
+MAX_BACKOFF = 60.0
+RETRY_STATUSES = {429, 503}
+
+# Documented SP-API Feeds 2021-06-30 usage plans: (requests per second, burst)
+SP_API_RATES = [
+    ("POST", re.compile(r"/feeds/2021-06-30/documents$"), "createFeedDocument", 0.5, 15),
+    ("POST", re.compile(r"/feeds/2021-06-30/feeds$"), "createFeed", 0.0083, 15),
+    ("GET", re.compile(r"/feeds/2021-06-30/feeds/[^/]+$"), "getFeed", 2.0, 15),
+    ("GET", re.compile(r"/feeds/2021-06-30/documents/[^/]+$"), "getFeedDocument", 0.0222, 10),
+]
+# Shopify REST Admin API leaky bucket on standard plans: 40 requests, leaking 2 per second
+SHOPIFY_RATE = 2.0
+SHOPIFY_BUCKET = 40
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose rate adapts to throttling: it halves on every 429 and creeps
+    back towards the documented rate on each success (AIMD), settling at the sustainable maximum.
+    """
+
+    def __init__(self, rate, burst, min_rate=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available right now; never waits.
+        """
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.max_rate = rate
+            self.rate = min(self.rate, rate)
+
+    def set_available(self, available):
+        # the server told us how much room is left; never assume more than that
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, float(available))
+
+    def penalize(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def reward(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RequestScheduler:
+    """
+    Maps each request to its endpoint's token bucket, waits for a token before sending and
+    learns from the response headers (x-amzn-RateLimit-Limit, X-Shopify-Shop-Api-Call-Limit).
+    Requests to endpoints without a known limit pass straight through.
+    rate_scale multiplies every documented rate, e.g. to match a simulator running faster than real time.
+    """
+
+    def __init__(self, rate_scale=1.0):
+        self.rate_scale = rate_scale
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, method, url):
+        parsed = urlparse(url)
+        if "sellingpartnerapi" in parsed.netloc or parsed.netloc == urlparse(endpoints.url("SP_API_BASE_URL")).netloc:
+            for rule_method, pattern, name, rate, burst in SP_API_RATES:
+                if method == rule_method and pattern.search(parsed.path):
+                    return (parsed.netloc, name), rate * self.rate_scale, burst
+        elif "/admin/api/" in parsed.path:
+            return (parsed.netloc, "shopify"), SHOPIFY_RATE * self.rate_scale, SHOPIFY_BUCKET
+        return None, None, None
+
+    def bucket(self, method, url):
+        key, rate, burst = self._endpoint(method, url)
+        if key is None:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def acquire(self, method, url):
+        bucket = self.bucket(method, url)
+        if bucket is not None:
+            bucket.acquire()
+
+    def observe(self, method, url, response):
+        bucket = self.bucket(method, url)
+        if bucket is None:
+            return
+        amz_limit = response.headers.get("x-amzn-RateLimit-Limit")
+        if amz_limit:
+            bucket.set_rate(float(amz_limit))
+        shopify_limit = response.headers.get("X-Shopify-Shop-Api-Call-Limit")
+        if shopify_limit:
+            used, capacity = (int(n) for n in shopify_limit.split("/"))
+            bucket.set_available(capacity - used)
+        if response.status_code in RETRY_STATUSES:
+            bucket.penalize()
+        else:
+            bucket.reward()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f"{host} {name}": {"rate": round(b.rate, 4), "max_rate": b.max_rate, "tokens": round(b.tokens, 2)}
+                for (host, name), b in self._buckets.items()
+            }
+
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before retrying a throttled response: Retry-After when present,
+    otherwise exponential backoff with jitter.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF, float(retry_after))
+        except ValueError:
+            pass
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt) * random.uniform(0.5, 1.0)
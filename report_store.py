@@ -0,0 +1,158 @@
+import json
+import time
+
+import sqlite_store
+
+DEFAULT_DB_PATH = "feed_reports.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    feed_id TEXT PRIMARY KEY,
+    submitted_at REAL NOT NULL,
+    report_ingested_at REAL,
+    messages_processed INTEGER,
+    messages_accepted INTEGER,
+    messages_invalid INTEGER
+);
+CREATE TABLE IF NOT EXISTS feed_messages (
+    feed_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    sku TEXT NOT NULL,
+    PRIMARY KEY (feed_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    feed_id TEXT NOT NULL,
+    message_id INTEGER,
+    sku TEXT,
+    severity TEXT,
+    code TEXT,
+    attribute TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_feed_severity ON issues (feed_id, severity);
+CREATE INDEX IF NOT EXISTS issues_sku ON issues (sku);
+CREATE INDEX IF NOT EXISTS issues_code ON issues (code, severity);
+CREATE INDEX IF NOT EXISTS feeds_submitted ON feeds (submitted_at);
+"""
+
+
+def parse_report(report_text, skus=None):
+    """
+    Parses a JSON_LISTINGS_FEED processing report into (summary, issues).
+    skus[i] is the SKU of messageId i + 1, as recorded in the feed_sharding manifest.
+    Reports that are not JSON (e.g. legacy flat-file reports) yield no issues.
+    """
+    try:
+        report = json.loads(report_text)
+    except ValueError:
+        return {}, []
+    skus = skus or []
+    issues = []
+    for issue in report.get("issues", []):
+        message_id = issue.get("messageId")
+        attributes = issue.get("attributeNames") or ([issue["attributeName"]] if issue.get("attributeName") else [])
+        sku = issue.get("sku")
+        if sku is None and isinstance(message_id, int) and 0 < message_id <= len(skus):
+            sku = skus[message_id - 1]
+        issues.append({
+            "message_id": message_id,
+            "sku": sku,
+            "severity": issue.get("severity"),
+            "code": str(issue.get("code")) if issue.get("code") is not None else None,
+            "attribute": ",".join(attributes) or None,
+            "message": issue.get("message")
+        })
+    return report.get("summary", {}), issues
+
+
+class ReportStore:
+    """
+    SQLite index of processing-report issues keyed by feed, SKU, severity and issue code.
+    Opens a short-lived connection per call, so one store can be shared across threads.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        sqlite_store.initialize(self.path, SCHEMA)
+
+    def _connect(self):
+        return sqlite_store.connect(self.path)
+
+    def register_feed(self, feed_id, skus):
+        """
+        Records a submitted feed and the SKU of each message so report issues can be mapped back to SKUs.
+        """
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO feeds (feed_id, submitted_at) VALUES (?, ?)", (feed_id, time.time()))
+            conn.executemany(
+                "INSERT OR REPLACE INTO feed_messages (feed_id, message_id, sku) VALUES (?, ?, ?)",
+                [(feed_id, idx, sku) for idx, sku in enumerate(skus, start=1)]
+            )
+
+    def ingest_report(self, feed_id, report_text):
+        """
+        Parses a processing report and replaces any issues stored for the feed. Returns the issue count.
+        """
+        with self._connect() as conn:
+            skus = [row["sku"] for row in conn.execute(
+                "SELECT sku FROM feed_messages WHERE feed_id = ? ORDER BY message_id", (feed_id,)
+            )]
+            summary, issues = parse_report(report_text, skus)
+            conn.execute("INSERT OR IGNORE INTO feeds (feed_id, submitted_at) VALUES (?, ?)", (feed_id, time.time()))
+            conn.execute(
+                "UPDATE feeds SET report_ingested_at = ?, messages_processed = ?, messages_accepted = ?, "
+                "messages_invalid = ? WHERE feed_id = ?",
+                (time.time(), summary.get("messagesProcessed"), summary.get("messagesAccepted"),
+                 summary.get("messagesInvalid"), feed_id)
+            )
+            conn.execute("DELETE FROM issues WHERE feed_id = ?", (feed_id,))
+            conn.executemany(
+                "INSERT INTO issues (feed_id, message_id, sku, severity, code, attribute, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(feed_id, i["message_id"], i["sku"], i["severity"], i["code"], i["attribute"], i["message"])
+                 for i in issues]
+            )
+        return len(issues)
+
+    def query_issues(self, severity=None, feed_id=None, sku=None, code=None, attribute_like=None,
+                     last_feeds=None, limit=1000):
+        """
+        Returns matching issues as dicts, newest feeds first.
+        attribute_like is a substring match, e.g. "image_locator".
+        """
+        clauses, params = [], []
+        if severity:
+            clauses.append("i.severity = ?")
+            params.append(severity)
+        if feed_id:
+            clauses.append("i.feed_id = ?")
+            params.append(feed_id)
+        if sku:
+            clauses.append("i.sku = ?")
+            params.append(sku)
+        if code:
+            clauses.append("i.code = ?")
+            params.append(str(code))
+        if attribute_like:
+            clauses.append("i.attribute LIKE ?")
+            params.append(f"%{attribute_like}%")
+        if last_feeds:
+            clauses.append("i.feed_id IN (SELECT feed_id FROM feeds ORDER BY submitted_at DESC LIMIT ?)")
+            params.append(last_feeds)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT i.feed_id, i.message_id, i.sku, i.severity, i.code, i.attribute, i.message "
+            f"FROM issues i JOIN feeds f ON f.feed_id = i.feed_id {where} "
+            "ORDER BY f.submitted_at DESC, i.message_id LIMIT ?"
+        )
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params + [limit])]
+
+    def failing_skus(self, attribute_like=None, code=None, severity="ERROR", last_feeds=None):
+        """
+        Returns the distinct SKUs with a matching issue, e.g. failing_skus(attribute_like="image_locator").
+        """
+        issues = self.query_issues(severity=severity, code=code, attribute_like=attribute_like,
+                                   last_feeds=last_feeds, limit=-1)
+        return sorted({i["sku"] for i in issues if i["sku"]})
@@ -0,0 +1,75 @@
+import endpoints
+import http_client
+import tracing
+from product_catalog import get_catalog
+from upload_cache import content_digest
+
+SHOPIFY_API_VERSION = "2023-01"
+
+
+def product_fields(title_slug, title_full, product_line=None):
+    line = get_catalog().line(product_line)
+    return {
+        "title": title_full,
+        "handle": title_slug,
+        "body_html": line.description,
+        "vendor": line.shopify["vendor"],
+        "product_type": line.shopify["product_type"],
+        "tags": line.shopify["tags"]
+    }
+
+
+@tracing.traced("imgbb.upload", stage="imgbb")
+def upload_image_to_imgbb(uploaded_file, title_slug, imgbb_api_key):
+    uploaded_file.seek(0)
+    files = {
+        "key": (None, imgbb_api_key),
+        "name": (None, title_slug),
+        "image": uploaded_file
+    }
+    response = http_client.post(endpoints.url("IMGBB_UPLOAD_URL"), files=files)
+    response.raise_for_status()
+    return response.json()["data"]["url"]
+
+
+def cached_imgbb_upload(uploaded_file, title_slug, imgbb_api_key, cache=None):
+    """
+    Uploads to ImgBB unless the cache already has this image. Returns (digest, cached entry, image_url).
+    """
+    uploaded_file.seek(0)
+    digest = content_digest(uploaded_file.read())
+    uploaded_file.seek(0)
+    cached = (cache.get(digest, title_slug) if cache else None) or {}
+    image_url = cached.get("imgbb_url")
+    if not image_url and not cached.get("image_src"):
+        image_url = upload_image_to_imgbb(uploaded_file, title_slug, imgbb_api_key)
+        if cache:
+            cache.put_imgbb(digest, title_slug, image_url)
+    return digest, cached, image_url
+
+
+@tracing.traced("shopify.upload_and_create_product")
+def upload_and_create_shopify_product(uploaded_file, title_slug, title_full, shopify_store, shopify_token,
+                                      imgbb_api_key, cache=None):
+    """
+    Uploads the image to ImgBB, creates the Shopify product and returns its CDN image src.
+    With an upload_cache.UploadCache, finished steps are skipped on re-runs.
+    """
+    digest, cached, image_url = cached_imgbb_upload(uploaded_file, title_slug, imgbb_api_key, cache)
+    if cached.get("image_src"):
+        return cached["image_src"]
+
+    shopify_url = endpoints.shopify_admin_url(shopify_store, SHOPIFY_API_VERSION, "products.json")
+    headers = {
+        "X-Shopify-Access-Token": shopify_token,
+        "Content-Type": "application/json"
+    }
+    payload = {"product": dict(product_fields(title_slug, title_full), images=[{"src": image_url}])}
+    with tracing.span("shopify.create_product", stage="shopify"):
+        r = http_client.post(shopify_url, json=payload, headers=headers, verify=False)
+        r.raise_for_status()
+    shopify_product = r.json()["product"]
+    shopify_image_url = shopify_product["images"][0]["src"]
+    if cache:
+        cache.put_product(digest, title_slug, shopify_product["id"], shopify_image_url)
+    return shopify_image_url
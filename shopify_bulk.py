@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+
+import endpoints
+import http_client
+import tracing
+from shopify_api import product_fields
+
+SHOPIFY_GRAPHQL_VERSION = "2023-10"
+POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 30
+TIMEOUT = 3600
+NODES_PAGE_SIZE = 250  # max ids per nodes() query
+
+STAGED_UPLOADS_MUTATION = """
+mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+PRODUCT_CREATE_MUTATION = """
+mutation call($input: ProductInput!, $media: [CreateMediaInput!]) {
+  productCreate(input: $input, media: $media) {
+    product { id handle featuredImage { url } }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_RUN_MUTATION = """
+mutation bulkOperationRunMutation($mutation: String!, $stagedUploadPath: String!) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $stagedUploadPath) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+query {
+  currentBulkOperation(type: MUTATION) { id status errorCode objectCount url partialDataUrl }
+}
+"""
+
+FEATURED_IMAGES_QUERY = """
+query featuredImages($ids: [ID!]!) {
+  nodes(ids: $ids) { ... on Product { id featuredImage { url } } }
+}
+"""
+
+# Shopify runs one bulk mutation per shop at a time
+_bulk_lock = threading.Lock()
+
+
+@tracing.traced("shopify.graphql", stage="shopify")
+def graphql(shopify_store, shopify_token, query, variables=None):
+    r = http_client.post(
+        endpoints.shopify_admin_url(shopify_store, SHOPIFY_GRAPHQL_VERSION, "graphql.json"),
+        json={"query": query, "variables": variables or {}},
+        headers={"X-Shopify-Access-Token": shopify_token, "Content-Type": "application/json"}
+    )
+    r.raise_for_status()
+    body = r.json()
+    if body.get("errors"):
+        raise RuntimeError(f"Shopify GraphQL error: {body['errors']}")
+    return body["data"]
+
+
+def _raise_user_errors(result, name):
+    if result.get("userErrors"):
+        raise RuntimeError(f"{name} failed: {result['userErrors']}")
+
+
+def product_input(design):
+    fields = product_fields(design["handle"], design["title_full"])
+    return {
+        "title": fields["title"],
+        "handle": fields["handle"],
+        "descriptionHtml": fields["body_html"],
+        "vendor": fields["vendor"],
+        "productType": fields["product_type"],
+        "tags": fields["tags"].split(",")
+    }
+
+
+def bulk_mutation_jsonl(designs):
+    """
+    One productCreate variables object per line, in design order.
+    """
+    return "".join(json.dumps({
+        "input": product_input(design),
+        "media": [{"originalSource": design["image_url"], "mediaContentType": "IMAGE"}]
+    }) + "\n" for design in designs).encode("utf-8")
+
+
+@tracing.traced("shopify.stage_upload", stage="shopify")
+def stage_upload(shopify_store, shopify_token, content):
+    """
+    Uploads the JSONL variables file to Shopify's staged upload target and returns its stagedUploadPath.
+    """
+    result = graphql(shopify_store, shopify_token, STAGED_UPLOADS_MUTATION, {"input": [{
+        "resource": "BULK_MUTATION_VARIABLES",
+        "filename": "products.jsonl",
+        "mimeType": "text/jsonl",
+        "httpMethod": "POST"
+    }]})["stagedUploadsCreate"]
+    _raise_user_errors(result, "stagedUploadsCreate")
+    target = result["stagedTargets"][0]
+    params = {p["name"]: p["value"] for p in target["parameters"]}
+    # the file must come after every form parameter
+    files = {name: (None, value) for name, value in params.items()}
+    files["file"] = ("products.jsonl", content, "text/jsonl")
+    upload = http_client.post(target["url"], files=files)
+    upload.raise_for_status()
+    return params["key"]
+
+
+def wait_for_bulk_operation(shopify_store, shopify_token, operation_id, poll_interval=POLL_INTERVAL,
+                            timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    delay = poll_interval
+    while True:
+        operation = graphql(shopify_store, shopify_token, CURRENT_BULK_OPERATION_QUERY)["currentBulkOperation"]
+        if operation and operation["id"] == operation_id and operation["status"] not in ("CREATED", "RUNNING"):
+            return operation
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Bulk operation {operation_id} did not finish within {timeout}s")
+        time.sleep(delay)
+        delay = min(MAX_POLL_INTERVAL, delay * 1.5)
+
+
+@tracing.traced("shopify.download_bulk_results", stage="shopify")
+def download_results(url):
+    r = http_client.get(url)
+    r.raise_for_status()
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+
+def fetch_featured_images(shopify_store, shopify_token, product_ids):
+    images = {}
+    for start in range(0, len(product_ids), NODES_PAGE_SIZE):
+        ids = product_ids[start:start + NODES_PAGE_SIZE]
+        for node in graphql(shopify_store, shopify_token, FEATURED_IMAGES_QUERY, {"ids": ids})["nodes"]:
+            if node and node.get("featuredImage"):
+                images[node["id"]] = node["featuredImage"]["url"]
+    return images
+
+
+def _numeric_id(gid):
+    return int(gid.rsplit("/", 1)[-1])
+
+
+def featured_image_srcs(shopify_store, shopify_token, product_ids):
+    """
+    CDN image urls of the products (numeric ids) whose media Shopify has finished processing, by product id.
+    """
+    gids = [f"gid://shopify/Product/{product_id}" for product_id in product_ids]
+    return {_numeric_id(gid): url for gid, url in fetch_featured_images(shopify_store, shopify_token, gids).items()}
+
+
+@tracing.traced("shopify.bulk_create_products", stage="shopify")
+def bulk_create_products(designs, shopify_store, shopify_token, poll_interval=POLL_INTERVAL, timeout=TIMEOUT):
+    """
+    Creates one Shopify product per design with a single bulkOperationRunMutation instead of one REST call each.
+    designs are dicts with handle, title_full and image_url (already uploaded to ImgBB).
+
+    Returns one {"product_id", "image_src", "error"} dict per design, in order. image_src is the Shopify CDN
+    url, or None while Shopify is still processing the media; featured_image_srcs() fetches it later.
+    """
+    if not designs:
+        return []
+    with _bulk_lock:
+        staged_path = stage_upload(shopify_store, shopify_token, bulk_mutation_jsonl(designs))
+        run = graphql(shopify_store, shopify_token, BULK_RUN_MUTATION, {
+            "mutation": PRODUCT_CREATE_MUTATION,
+            "stagedUploadPath": staged_path
+        })["bulkOperationRunMutation"]
+        _raise_user_errors(run, "bulkOperationRunMutation")
+        operation = wait_for_bulk_operation(shopify_store, shopify_token, run["bulkOperation"]["id"],
+                                            poll_interval, timeout)
+
+    results = [{"product_id": None, "image_src": None, "error": "No result returned"} for _ in designs]
+    url = operation.get("url") or operation.get("partialDataUrl")
+    if operation["status"] != "COMPLETED" and not url:
+        error = f"Bulk operation {operation['status']}: {operation.get('errorCode')}"
+        return [dict(r, error=error) for r in results]
+
+    gids = {}
+    for line in download_results(url) if url else []:
+        idx = line.get("__lineNumber")
+        if idx is None or idx >= len(designs):
+            continue
+        created = (line.get("data") or {}).get("productCreate") or {}
+        product = created.get("product")
+        if not product:
+            results[idx]["error"] = str(created.get("userErrors") or line.get("errors"))
+            continue
+        gids[idx] = product["id"]
+        image = product.get("featuredImage")
+        results[idx] = {
+            "product_id": _numeric_id(product["id"]),
+            "image_src": image["url"] if image else None,
+            "error": None
+        }
+
+    missing = [gids[idx] for idx, r in enumerate(results) if idx in gids and not r["image_src"]]
+    images = fetch_featured_images(shopify_store, shopify_token, missing) if missing else {}
+    for idx, gid in gids.items():
+        if not results[idx]["image_src"]:
+            results[idx]["image_src"] = images.get(gid)
+    return results
@@ -0,0 +1,507 @@
+import email
+import email.policy
+import gzip
+import itertools
+import json
+import random
+import re
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import endpoints
+from feed_sharding import MAX_FEED_BYTES, MAX_FEED_MESSAGES
+from rate_limiter import SHOPIFY_BUCKET, SHOPIFY_RATE, SP_API_RATES, TokenBucket
+
+# One local server per external host, so per-host connection limits and pools behave as in production
+SERVICES = ("sp_api", "lwa", "documents", "imgbb", "shopify")
+
+# Operation names used as keys for latency, failure_rate and the request stats
+SP_API_OPERATIONS = [(method, pattern, name) for method, pattern, name, _, _ in SP_API_RATES]
+SHOPIFY_REST_PATH = re.compile(r"/admin/api/[^/]+/products\.json$")
+SHOPIFY_GRAPHQL_PATH = re.compile(r"/admin/api/[^/]+/graphql\.json$")
+IN_QUEUE_SHARE = 0.2  # share of processing_time a feed spends IN_QUEUE before IN_PROGRESS
+
+
+def _self_signed_certificate(directory):
+    # one certificate for 127.0.0.1 serves every simulated host; clients trust it via its path
+    cert_path, key_path = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key_path, "-out", cert_path],
+        check=True, capture_output=True
+    )
+    return cert_path, key_path
+
+
+def _per_operation(value, operation):
+    if isinstance(value, dict):
+        return value.get(operation, value.get("default", 0))
+    return value
+
+
+def _multipart_fields(content_type, body):
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body,
+                                       policy=email.policy.HTTP)
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def _read_feed(content, content_encoding):
+    """
+    Returns (uncompressed size, SKU of every message, whether it is a JSON feed) for an uploaded feed document.
+    """
+    if content_encoding == "gzip":
+        content = gzip.decompress(content)
+    try:
+        return len(content), [message.get("sku") for message in json.loads(content).get("messages", [])], True
+    except ValueError:
+        # flat-file feeds: one row per SKU under a header row
+        return len(content), [row.split(b"\t", 1)[0].decode("utf-8") for row in content.splitlines()[1:] if row], False
+
+
+class Simulator:
+    """
+    Local stand-in for SP-API feeds and feed documents, LWA, ImgBB and Shopify (REST products and GraphQL bulk
+    operations), for offline tests and benchmarks.
+
+    latency and failure_rate are seconds / probabilities, either one value for every operation or a dict keyed
+    by operation name (createFeedDocument, createFeed, getFeed, getFeedDocument, uploadFeedDocument,
+    downloadDocument, lwaToken, imgbbUpload, shopifyProduct, shopifyGraphql, stagedUpload, bulkResults) with an
+    optional "default". Failed requests get failure_status, and injected 429s carry a Retry-After of retry_after
+    seconds. With throttle=True, SP-API operations enforce their documented usage plans and Shopify its leaky
+    bucket, all multiplied by rate_scale, and answer 429 when exceeded. Feeds stay IN_QUEUE/IN_PROGRESS for
+    processing_time seconds, and issue_rate of their messages get an ERROR in the processing report. A JSON feed
+    document over max_feed_bytes (uncompressed) is rejected on upload, and createFeed rejects a JSON_LISTINGS_FEED
+    with more than max_feed_messages messages; flat-file feeds have no such limits. With media_ready=False,
+    product lookups report no featured image yet, as while Shopify is still processing the products' media.
+
+    With tls=True every service is served over HTTPS with a self-signed certificate (made with the openssl CLI)
+    whose path is cert_path; pass it to http_client.configure(verify=...). connections counts the connections
+    each service accepted, so keep-alive reuse (and the TLS handshakes it saves) can be measured.
+
+    with Simulator(latency=0.05).start() as sim:
+        sim.configure_endpoints()  # sp_api, lwa_token, shopify_api and shopify_bulk now talk to sim
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503, retry_after=1.0,
+                 throttle=True, rate_scale=1.0, processing_time=1.0, bulk_row_time=0.001, token_ttl=3600,
+                 issue_rate=0.0, max_feed_bytes=MAX_FEED_BYTES, max_feed_messages=MAX_FEED_MESSAGES, tls=False,
+                 media_ready=True, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.throttle = throttle
+        self.rate_scale = rate_scale
+        self.processing_time = processing_time
+        self.bulk_row_time = bulk_row_time
+        self.token_ttl = token_ttl
+        self.issue_rate = issue_rate
+        self.max_feed_bytes = max_feed_bytes
+        self.max_feed_messages = max_feed_messages
+        self.tls = tls
+        self.media_ready = media_ready
+        self.cert_path = None
+        self._cert_dir = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._servers = {}
+        self._threads = []
+        self._buckets = {}
+        self.documents = {}
+        self.feeds = {}
+        self.staged_uploads = {}
+        self.bulk_operations = []
+        self.products = {}
+        self.stats = {}
+        self.connections = {service: 0 for service in SERVICES}
+
+    # === LIFECYCLE ===
+
+    def start(self):
+        context = None
+        if self.tls:
+            self._cert_dir = tempfile.mkdtemp(prefix="simulator-tls-")
+            self.cert_path, key_path = _self_signed_certificate(self._cert_dir)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cert_path, key_path)
+        for service in SERVICES:
+            handler = type(f"{service}_handler", (_Handler,), {"simulator": self, "service": service})
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            if context is not None:
+                # the handshake runs on the handler thread, so a slow client doesn't block accept()
+                server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._servers[service] = server
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+        if self._cert_dir:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+            self._cert_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        endpoints.reset()
+        self.stop()
+
+    def url(self, service):
+        host, port = self._servers[service].server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}"
+
+    def urls(self):
+        return {
+            "SP_API_BASE_URL": self.url("sp_api"),
+            "LWA_TOKEN_URL": f"{self.url('lwa')}/auth/o2/token",
+            "IMGBB_UPLOAD_URL": f"{self.url('imgbb')}/1/upload",
+            "SHOPIFY_BASE_URL": self.url("shopify")
+        }
+
+    def configure_endpoints(self):
+        endpoints.configure(**self.urls())
+
+    def snapshot(self):
+        with self._lock:
+            return {operation: dict(stats) for operation, stats in self.stats.items()}
+
+    # === REQUEST HANDLING ===
+
+    def _connected(self, service):
+        with self._lock:
+            self.connections[service] += 1
+
+    def _count(self, operation, key, amount=1):
+        with self._lock:
+            stats = self.stats.setdefault(operation, {"requests": 0, "throttled": 0, "failed": 0, "bytes_in": 0})
+            stats[key] += amount
+
+    def _bucket(self, operation):
+        if not self.throttle:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(operation)
+            if bucket is None:
+                limits = {name: (rate, burst) for _, _, name, rate, burst in SP_API_RATES}
+                limits["shopify"] = (SHOPIFY_RATE, SHOPIFY_BUCKET)
+                if operation not in limits:
+                    return None
+                rate, burst = limits[operation]
+                bucket = self._buckets[operation] = TokenBucket(rate * self.rate_scale, burst)
+            return bucket
+
+    def handle(self, service, method, path, headers, body):
+        """
+        Returns (status, headers, body) for one request.
+        """
+        operation, handler = self._route(service, method, path)
+        if handler is None:
+            return 404, {}, {"errors": [{"code": "NotFound", "message": f"{method} {path}"}]}
+        self._count(operation, "requests")
+        self._count(operation, "bytes_in", len(body))
+
+        delay = _per_operation(self.latency, operation)
+        if delay:
+            time.sleep(delay * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+        limit_key = "shopify" if service == "shopify" else operation
+        bucket = self._bucket(limit_key)
+        response_headers = {}
+        if bucket is not None:
+            if service == "sp_api":
+                response_headers["x-amzn-RateLimit-Limit"] = f"{bucket.max_rate:g}"
+            if not bucket.try_acquire():
+                self._count(operation, "throttled")
+                if service == "shopify":
+                    response_headers["Retry-After"] = f"{1 / bucket.rate:.2f}"
+                return 429, response_headers, {"errors": [{"code": "QuotaExceeded", "message": "Throttled"}]}
+            if service == "shopify":
+                used = SHOPIFY_BUCKET - int(bucket.tokens)
+                response_headers["X-Shopify-Shop-Api-Call-Limit"] = f"{used}/{SHOPIFY_BUCKET}"
+
+        if self._random.random() < _per_operation(self.failure_rate, operation):
+            self._count(operation, "failed")
+            if self.failure_status == 429:
+                response_headers["Retry-After"] = f"{self.retry_after:g}"
+            return self.failure_status, response_headers, {"errors": [{"code": "InternalFailure",
+                                                                       "message": "Injected failure"}]}
+        status, extra_headers, payload = handler(path, headers, body)
+        return status, {**response_headers, **extra_headers}, payload
+
+    def _route(self, service, method, path):
+        if service == "lwa" and method == "POST" and path == "/auth/o2/token":
+            return "lwaToken", self._lwa_token
+        if service == "imgbb" and method == "POST" and path == "/1/upload":
+            return "imgbbUpload", self._imgbb_upload
+        if service == "sp_api":
+            for rule_method, pattern, name in SP_API_OPERATIONS:
+                if method == rule_method and pattern.search(path):
+                    return name, getattr(self, f"_{name}")
+        if service == "shopify" and method == "POST":
+            if SHOPIFY_REST_PATH.search(path):
+                return "shopifyProduct", self._shopify_product
+            if SHOPIFY_GRAPHQL_PATH.search(path):
+                return "shopifyGraphql", self._shopify_graphql
+        if service == "documents":
+            if method == "PUT" and path.startswith("/uploads/"):
+                return "uploadFeedDocument", self._upload_document
+            if method == "GET" and path.startswith("/reports/"):
+                return "downloadDocument", self._download_report
+            if method == "POST" and path == "/staged-uploads":
+                return "stagedUpload", self._staged_upload
+            if method == "GET" and path.startswith("/bulk-results/"):
+                return "bulkResults", self._bulk_results
+        return None, None
+
+    def _next_id(self):
+        return next(self._ids)
+
+    # === LWA ===
+
+    def _lwa_token(self, path, headers, body):
+        return 200, {}, {"access_token": f"Atza|sim-{self._next_id()}", "token_type": "bearer",
+                         "expires_in": self.token_ttl}
+
+    # === SP-API FEEDS ===
+
+    def _createFeedDocument(self, path, headers, body):
+        document_id = f"amzn1.tortuga.sim.{self._next_id()}"
+        with self._lock:
+            self.documents[document_id] = {"messages": None, "bytes": 0, "uncompressed_bytes": 0, "skus": []}
+        return 201, {}, {"feedDocumentId": document_id, "url": f"{self.url('documents')}/uploads/{document_id}"}
+
+    def _upload_document(self, path, headers, body):
+        document_id = path.rsplit("/", 1)[-1]
+        with self._lock:
+            document = self.documents.get(document_id)
+            if document is None:
+                return 404, {}, {"errors": [{"code": "NoSuchKey"}]}
+        size, skus, is_json = _read_feed(body, headers.get("Content-Encoding"))
+        if is_json and size > self.max_feed_bytes:
+            return 400, {}, {"errors": [{"code": "EntityTooLarge",
+                                         "message": f"{size} bytes exceeds {self.max_feed_bytes}"}]}
+        with self._lock:
+            document.update(messages=len(skus), bytes=len(body), uncompressed_bytes=size, skus=skus)
+        return 200, {}, b""
+
+    def _createFeed(self, path, headers, body):
+        request = json.loads(body)
+        feed_id = str(self._next_id())
+        with self._lock:
+            document = self.documents.get(request["inputFeedDocumentId"])
+            if document is None:
+                return 400, {}, {"errors": [{"code": "InvalidInput", "message": "Unknown feed document"}]}
+            if request["feedType"] == "JSON_LISTINGS_FEED" and (document["messages"] or 0) > self.max_feed_messages:
+                return 400, {}, {"errors": [{"code": "InvalidInput", "message": f"{document['messages']} messages "
+                                             f"exceeds {self.max_feed_messages}"}]}
+            self.feeds[feed_id] = {
+                "feedType": request["feedType"],
+                "created": time.monotonic(),
+                "messages": document["messages"] or 0,
+                "skus": document["skus"],
+                "resultFeedDocumentId": None
+            }
+        return 202, {}, {"feedId": feed_id}
+
+    def _feed_status(self, feed):
+        elapsed = time.monotonic() - feed["created"]
+        if elapsed < self.processing_time * IN_QUEUE_SHARE:
+            return "IN_QUEUE"
+        if elapsed < self.processing_time:
+            return "IN_PROGRESS"
+        return "DONE"
+
+    def _getFeed(self, path, headers, body):
+        feed_id = path.rsplit("/", 1)[-1]
+        with self._lock:
+            feed = self.feeds.get(feed_id)
+            if feed is None:
+                return 404, {}, {"errors": [{"code": "NotFound"}]}
+            status = self._feed_status(feed)
+            result = {"feedId": feed_id, "feedType": feed["feedType"], "processingStatus": status}
+            if status == "DONE":
+                if feed["resultFeedDocumentId"] is None:
+                    feed["resultFeedDocumentId"] = f"amzn1.tortuga.sim.report.{feed_id}"
+                result["resultFeedDocumentId"] = feed["resultFeedDocumentId"]
+        return 200, {}, result
+
+    def _getFeedDocument(self, path, headers, body):
+        document_id = path.rsplit("/", 1)[-1]
+        return 200, {}, {"feedDocumentId": document_id, "url": f"{self.url('documents')}/reports/{document_id}"}
+
+    def _download_report(self, path, headers, body):
+        feed_id = path.rsplit(".", 1)[-1]
+        with self._lock:
+            feed = self.feeds.get(feed_id)
+        if feed is None:
+            return 404, {}, b""
+        invalid = [message_id for message_id in range(1, feed["messages"] + 1)
+                   if self._random.random() < self.issue_rate]
+        return 200, {}, {
+            "header": {"feedId": feed_id, "version": "2.0"},
+            "issues": [{"messageId": message_id, "code": "90220", "severity": "ERROR",
+                        "attributeName": "item_name", "message": "Simulated issue"} for message_id in invalid],
+            "summary": {"errors": len(invalid), "warnings": 0, "messagesProcessed": feed["messages"],
+                        "messagesAccepted": feed["messages"] - len(invalid), "messagesInvalid": len(invalid)}
+        }
+
+    # === IMGBB ===
+
+    def _imgbb_upload(self, path, headers, body):
+        image_id = self._next_id()
+        return 200, {}, {"data": {"id": str(image_id), "url": f"{self.url('documents')}/images/{image_id}.png"},
+                         "success": True, "status": 200}
+
+    # === SHOPIFY ===
+
+    def _create_product(self, fields):
+        product_id = self._next_id()
+        product = {
+            "id": product_id,
+            "handle": fields.get("handle"),
+            "title": fields.get("title"),
+            "src": f"{self.url('documents')}/cdn/{product_id}.png"
+        }
+        with self._lock:
+            self.products[product_id] = product
+        return product
+
+    def _shopify_product(self, path, headers, body):
+        product = self._create_product(json.loads(body)["product"])
+        return 201, {}, {"product": {"id": product["id"], "handle": product["handle"], "title": product["title"],
+                                     "images": [{"src": product["src"]}]}}
+
+    def _staged_upload(self, path, headers, body):
+        fields = _multipart_fields(headers.get("Content-Type", ""), body)
+        with self._lock:
+            self.staged_uploads[fields["key"].decode("utf-8")] = fields["file"]
+        return 201, {}, b""
+
+    def _bulk_status(self, operation):
+        elapsed = time.monotonic() - operation["started"]
+        if elapsed < self.processing_time + operation["rows"] * self.bulk_row_time:
+            return "RUNNING"
+        return "COMPLETED"
+
+    def _shopify_graphql(self, path, headers, body):
+        request = json.loads(body)
+        query, variables = request["query"], request.get("variables") or {}
+        if "stagedUploadsCreate" in query:
+            key = f"tmp/{uuid.uuid4().hex}/bulk/products.jsonl"
+            return 200, {}, {"data": {"stagedUploadsCreate": {"stagedTargets": [{
+                "url": f"{self.url('documents')}/staged-uploads",
+                "resourceUrl": None,
+                "parameters": [{"name": "key", "value": key}, {"name": "Content-Type", "value": "text/jsonl"}]
+            }], "userErrors": []}}}
+        if "bulkOperationRunMutation" in query:
+            with self._lock:
+                running = [op for op in self.bulk_operations if self._bulk_status(op) == "RUNNING"]
+                lines = self.staged_uploads.pop(variables["stagedUploadPath"], b"").splitlines()
+                if running:
+                    return 200, {}, {"data": {"bulkOperationRunMutation": {"bulkOperation": None, "userErrors": [
+                        {"field": None, "message": "A bulk mutation operation for this app and shop is already "
+                                                   "in progress."}]}}}
+                operation = {"id": f"gid://shopify/BulkOperation/{self._next_id()}", "started": time.monotonic(),
+                             "rows": len(lines), "lines": lines, "results": None}
+                self.bulk_operations.append(operation)
+            return 200, {}, {"data": {"bulkOperationRunMutation": {
+                "bulkOperation": {"id": operation["id"], "status": "CREATED"}, "userErrors": []}}}
+        if "currentBulkOperation" in query:
+            with self._lock:
+                operation = self.bulk_operations[-1] if self.bulk_operations else None
+            if operation is None:
+                return 200, {}, {"data": {"currentBulkOperation": None}}
+            status = self._bulk_status(operation)
+            index = operation["id"].rsplit("/", 1)[-1]
+            return 200, {}, {"data": {"currentBulkOperation": {
+                "id": operation["id"], "status": status, "errorCode": None, "objectCount": str(operation["rows"]),
+                "url": f"{self.url('documents')}/bulk-results/{index}" if status == "COMPLETED" else None,
+                "partialDataUrl": None
+            }}}
+        if "nodes(" in query:
+            with self._lock:
+                products = [self.products.get(int(gid.rsplit("/", 1)[-1])) for gid in variables["ids"]]
+            return 200, {}, {"data": {"nodes": [
+                {"id": f"gid://shopify/Product/{p['id']}",
+                 "featuredImage": {"url": p["src"]} if self.media_ready else None} if p else None
+                for p in products
+            ]}}
+        return 200, {}, {"errors": [{"message": "Unsupported query in simulator"}]}
+
+    def _bulk_results(self, path, headers, body):
+        operation_id = f"gid://shopify/BulkOperation/{path.rsplit('/', 1)[-1]}"
+        with self._lock:
+            operation = next((op for op in self.bulk_operations if op["id"] == operation_id), None)
+        if operation is None:
+            return 404, {}, b""
+        if operation["results"] is None:
+            results = []
+            for line_number, line in enumerate(operation["lines"]):
+                product = self._create_product(json.loads(line)["input"])
+                # like Shopify, media is still processing when the operation completes
+                results.append(json.dumps({"data": {"productCreate": {
+                    "product": {"id": f"gid://shopify/Product/{product['id']}", "handle": product["handle"],
+                                "featuredImage": None},
+                    "userErrors": []
+                }}, "__lineNumber": line_number}))
+            operation["results"] = ("\n".join(results) + "\n").encode("utf-8")
+        return 200, {"Content-Type": "application/jsonl"}, operation["results"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be measured
+    simulator = None
+    service = None
+
+    def setup(self):
+        super().setup()
+        self.simulator._connected(self.service)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _dispatch(self):
+        body = self._read_body()
+        status, headers, payload = self.simulator.handle(
+            self.service, self.command, urlparse(self.path).path, self.headers, body
+        )
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = _dispatch
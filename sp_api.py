@@ -0,0 +1,130 @@
+import gzip
+
+import endpoints
+import http_client
+import tracing
+from feed_writer import write_feed
+from lwa_token import resolve_access_token
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _headers(access_token):
+    return {"x-amz-access-token": access_token, "Content-Type": "application/json"}
+
+
+class _FileBody:
+    """
+    Request body that streams a file in chunks with a known Content-Length.
+    The presigned feed-document URL rejects chunked transfer encoding, so the length must be set up front.
+    """
+
+    def __init__(self, fileobj, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        start = fileobj.tell()
+        fileobj.seek(0, 2)
+        self.length = fileobj.tell() - start
+        fileobj.seek(start)
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.fileobj.read(self.chunk_size if size is None or size < 0 else size)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def seek(self, position):
+        self.fileobj.seek(position)
+
+
+@tracing.traced("sp_api.create_feed_document", stage="sp_api")
+def create_feed_document(content_type, access_token):
+    doc_res = http_client.post(
+        f"{endpoints.feeds_url()}/documents",
+        headers=_headers(access_token),
+        json={"contentType": content_type}
+    )
+    doc_res.raise_for_status()
+    return doc_res.json()
+
+
+@tracing.traced("sp_api.upload_feed_document", stage="sp_api_upload")
+def upload_feed_document(url, data, content_type, content_encoding=None):
+    """
+    Uploads feed content to the presigned URL. data may be a str, bytes or a file opened in binary mode;
+    files are streamed in chunks instead of being read into memory.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    elif not isinstance(data, bytes):
+        data = _FileBody(data)
+    headers = {"Content-Type": content_type}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    upload = http_client.put(url, data=data, headers=headers)
+    upload.raise_for_status()
+
+
+@tracing.traced("sp_api.create_feed", stage="sp_api")
+def create_feed(feed_type, feed_document_id, marketplace_id, access_token):
+    feed_res = http_client.post(
+        f"{endpoints.feeds_url()}/feeds",
+        headers=_headers(access_token),
+        json={
+            "feedType": feed_type,
+            "marketplaceIds": [marketplace_id],
+            "inputFeedDocumentId": feed_document_id
+        }
+    )
+    feed_res.raise_for_status()
+    return feed_res.json()["feedId"]
+
+
+def submit_feed(data, feed_type, content_type, marketplace_id, access_token, content_encoding=None):
+    """
+    Creates a feed document, uploads data to it and submits the feed. Returns the feedId.
+    """
+    doc = create_feed_document(content_type, access_token)
+    upload_feed_document(doc["url"], data, content_type, content_encoding)
+    return create_feed(feed_type, doc["feedDocumentId"], marketplace_id, access_token)
+
+
+@tracing.traced("sp_api.submit_json_listings_feed")
+def submit_json_listings_feed(messages, seller_id, marketplace_id, access_token, compress=False):
+    """
+    Streams messages into a JSON_LISTINGS_FEED document and submits it. Returns the feedId.
+    access_token may be a token string or a callable such as lwa_token.TokenCache.get.
+    """
+    return submit_feed(
+        write_feed(seller_id, messages, compress=compress), "JSON_LISTINGS_FEED", "application/json",
+        marketplace_id, resolve_access_token(access_token), content_encoding="gzip" if compress else None
+    )
+
+
+@tracing.traced("sp_api.get_feed", stage="sp_api")
+def get_feed_response(feed_id, access_token):
+    """
+    Returns the raw getFeed response, including rate-limit headers, without raising on errors.
+    """
+    return http_client.get(f"{endpoints.feeds_url()}/feeds/{feed_id}", headers=_headers(access_token))
+
+
+@tracing.traced("sp_api.download_processing_report", stage="sp_api")
+def download_processing_report(feed_status, access_token):
+    doc_id = feed_status.get("resultFeedDocumentId")
+    if not doc_id:
+        return "Processing report not available yet."
+
+    doc_res = http_client.get(f"{endpoints.feeds_url()}/documents/{doc_id}",
+                              headers={"x-amz-access-token": access_token})
+    doc_res.raise_for_status()
+    doc_info = doc_res.json()
+
+    report = http_client.get(doc_info["url"])
+    report.raise_for_status()
+    if doc_info.get("compressionAlgorithm") == "GZIP":
+        return gzip.decompress(report.content).decode("utf-8")
+    return report.text
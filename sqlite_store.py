@@ -0,0 +1,34 @@
+import sqlite3
+from contextlib import contextmanager
+
+BUSY_TIMEOUT = 30  # seconds a writer waits on a locked database
+
+
+@contextmanager
+def connect(path):
+    """
+    Short-lived connection with sqlite3.Row rows; the block runs as one transaction and the connection is closed
+    afterwards, so a store built on it can be shared across threads.
+    """
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def initialize(path, schema, columns=None):
+    """
+    Switches the database to WAL (readers don't block the writer), creates the schema and adds any of
+    columns ({table: {column: type}}) missing from databases created before those columns existed.
+    """
+    with connect(path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(schema)
+        for table, table_columns in (columns or {}).items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in table_columns.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
@@ -0,0 +1,68 @@
+import os
+
+from batch_jobs import JobRunner, JobStore
+from benchmarks import SECRETS, make_png, simulated
+from feed_poller import FeedPoller
+from lwa_token import TokenCache
+from report_store import ReportStore
+from upload_cache import UploadCache, content_digest
+
+
+def _run(runner, files, bulk_shopify=False):
+    try:
+        job_id, _ = runner.submit(files, bulk_shopify=bulk_shopify)
+        runner.run(job_id)
+    finally:
+        runner.poller.stop()
+    return job_id
+
+
+def _runner(workdir):
+    token_cache = TokenCache("sim", "sim", "sim", background=False)
+    report_store = ReportStore(os.path.join(workdir, "reports.db"))
+    poller = FeedPoller(token_cache.get, on_report=report_store.ingest_report, initial_delay=0.1, max_delay=1.0)
+    return JobRunner(
+        SECRETS,
+        store=JobStore(os.path.join(workdir, "jobs.db"), os.path.join(workdir, "jobs")),
+        upload_cache=UploadCache(os.path.join(workdir, "uploads.db")),
+        report_store=report_store, token_cache=token_cache, poller=poller, poll_interval=0.1
+    )
+
+
+def test_repeated_design_is_skipped_without_failing_the_job(tmp_path):
+    files = [("Design A.png", make_png(1)), ("Other.png", make_png(2)), ("Design A.png", make_png(1))]
+    with simulated(latency=0.0):
+        runner = _runner(str(tmp_path))
+        job_id = _run(runner, files)
+
+    assert runner.store.get_job(job_id)["status"] == "done"
+    items = runner.store.items(job_id)
+    assert [item["status"] for item in items] == ["uploaded", "uploaded", "invalid"]
+    assert items[2]["error"] == "Duplicate of 'Design A.png' in this job"
+    skus = {sku for feed in runner.store.feeds(job_id) for sku in feed["skus"]}
+    assert any(sku.startswith(items[1]["slug"]) for sku in skus)
+
+
+def _cached_image_srcs(runner, items):
+    return {runner.upload_cache.get(content_digest(runner._payload(item).getvalue()), item["handle"])["image_src"]
+            for item in items}
+
+
+def test_bulk_job_does_not_cache_imgbb_url_as_shopify_image(tmp_path):
+    files = [(f"Design {i}.png", make_png(i)) for i in range(3)]
+    with simulated(latency=0.0, media_ready=False) as sim:
+        runner = _runner(str(tmp_path))
+        first = runner.store.items(_run(runner, files, bulk_shopify=True))
+        # Shopify has no CDN image yet: the designs are listed with their ImgBB urls, which are not cached
+        assert all("/images/" in item["image_url"] for item in first)
+        assert _cached_image_srcs(runner, first) == {None}
+
+        sim.media_ready = True
+        runner = _runner(str(tmp_path))
+        again = runner.store.items(_run(runner, files, bulk_shopify=True))
+
+    # the second run looks the images up for the products it already made instead of creating them again
+    assert len(sim.products) == 3
+    cdn = {product["src"] for product in sim.products.values()}
+    assert {item["image_url"] for item in again} == cdn
+    assert _cached_image_srcs(runner, again) == cdn
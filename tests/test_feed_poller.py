@@ -0,0 +1,118 @@
+import time
+from collections import Counter
+
+import pytest
+
+import sp_api
+from benchmarks import simulated
+from feed_poller import FeedPoller
+from rate_limiter import MAX_RETRIES
+
+TOKEN = "Atza|test"
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    """
+    Records every getFeed call the poller makes as (feed_id, started, finished, status code, processingStatus).
+    """
+    calls = []
+    get_feed_response = sp_api.get_feed_response
+
+    def recording(feed_id, access_token):
+        started = time.monotonic()
+        response = get_feed_response(feed_id, access_token)
+        processing_status = response.json().get("processingStatus") if response.status_code == 200 else None
+        calls.append((feed_id, started, time.monotonic(), response.status_code, processing_status))
+        return response
+
+    monkeypatch.setattr(sp_api, "get_feed_response", recording)
+    return calls
+
+
+def _create_feed(skus):
+    messages = [{"messageId": idx, "sku": sku, "operationType": "DELETE"} for idx, sku in enumerate(skus, start=1)]
+    return sp_api.submit_json_listings_feed(messages, "A1SELLER", "ATVPDKIKX0DER", TOKEN)
+
+
+def _wait_for(condition, timeout=15):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_backoff_grows_until_the_feed_is_done(checks):
+    with simulated(rate_scale=1000, processing_time=2.0) as sim:
+        feed_id = _create_feed(["A", "B"])
+        poller = FeedPoller(TOKEN, initial_delay=0.05, max_delay=0.4, multiplier=2, jitter=0)
+        try:
+            poller.track(feed_id)
+            _wait_for(lambda: poller.snapshot()[feed_id]["status"] == "DONE")
+        finally:
+            poller.stop()
+
+    starts = [started for _, started, _, _, _ in checks]
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    # 0.1, 0.2, 0.4 and then capped at max_delay
+    expected = [min(0.4, 0.05 * 2 ** n) for n in range(1, len(gaps) + 1)]
+    assert len(gaps) >= 5
+    for gap, delay in zip(gaps, expected):
+        assert delay * 0.9 <= gap <= delay + 0.15
+    # the feed moves through every state while it is being polled
+    statuses = [processing_status for *_, processing_status in checks]
+    assert sorted(set(statuses), key=statuses.index) == ["IN_QUEUE", "IN_PROGRESS", "DONE"]
+    assert sim.snapshot()["getFeed"]["requests"] == len(checks)
+
+
+def test_throttled_checks_wait_for_retry_after(checks):
+    with simulated(rate_scale=1000, processing_time=0.2, failure_rate={"getFeed": 1.0}, failure_status=429,
+                   retry_after=0.3) as sim:
+        feed_id = _create_feed(["A"])
+        reports = []
+        poller = FeedPoller(TOKEN, on_report=lambda *args: reports.append(args), initial_delay=0.05, jitter=0)
+        try:
+            poller.track(feed_id)
+            _wait_for(lambda: len(checks) == 2)
+            state = poller.snapshot()[feed_id]
+            assert state["status"] == "SUBMITTED" and state["checks"] == 0
+            assert state["error"] == "Throttled by SP-API"
+            # http_client retries each 429 after Retry-After before it hands the response to the poller
+            assert sim.snapshot()["getFeed"]["failed"] >= 2 * (MAX_RETRIES + 1)
+
+            sim.failure_rate = 0.0
+            _wait_for(lambda: reports)
+        finally:
+            poller.stop()
+
+    (_, _, throttled_at, first_status, _), (_, second_started, _, second_status, _) = checks[:2]
+    assert first_status == second_status == 429
+    assert second_started - throttled_at >= 0.3
+    assert checks[-1][3] == 200
+    assert poller.snapshot()[feed_id]["status"] == "DONE"
+    assert poller.snapshot()[feed_id]["error"] is None
+
+
+def test_every_finished_feed_reports_once(checks):
+    with simulated(rate_scale=1000, processing_time=0.3, issue_rate=0.5, seed=7):
+        feed_ids = [_create_feed([f"F{i}-A", f"F{i}-B"]) for i in range(5)]
+        reports = []
+        poller = FeedPoller(TOKEN, on_report=lambda *args: reports.append(args), initial_delay=0.05,
+                            max_delay=0.2)
+        try:
+            for feed_id in feed_ids:
+                poller.track(feed_id)
+            _wait_for(lambda: len(reports) == len(feed_ids))
+            checks_when_done = len(checks)
+            time.sleep(0.5)
+        finally:
+            poller.stop()
+
+    assert Counter(feed_id for feed_id, _ in reports) == Counter(feed_ids)
+    states = poller.snapshot(feed_ids)
+    for feed_id, report in reports:
+        assert states[feed_id]["status"] == "DONE"
+        assert states[feed_id]["report"] == report
+        assert '"messagesProcessed": 2' in report
+    # finished feeds are no longer polled
+    assert len(checks) == checks_when_done
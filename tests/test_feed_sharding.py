@@ -0,0 +1,72 @@
+import pytest
+
+import sp_api
+from benchmarks import SECRETS, simulated
+from feed_sharding import HEADER_BYTES, _parent_sku, shard_messages, submit_sharded
+from feed_writer import write_feed
+from listing_feed import generate_listing_messages
+
+TOKEN = "Atza|test"
+
+
+def _messages(designs):
+    return [m for i in range(designs) for m in generate_listing_messages(f"Design {i}", "https://img", f"D-{i}")]
+
+
+def _submit(shard):
+    return sp_api.submit_json_listings_feed(shard, SECRETS["SELLER_ID"], SECRETS["MARKETPLACE_ID"], TOKEN)
+
+
+# one design is a family of 28 messages and about 160 KB, so the first pair is bound by size, the second by count
+@pytest.mark.parametrize("max_bytes, max_messages", [(400_000, 1000), (5_000_000, 60)])
+def test_shards_stay_within_limits_and_keep_families_together(max_bytes, max_messages):
+    messages = _messages(20)
+    with simulated(rate_scale=1000, max_feed_bytes=max_bytes, max_feed_messages=max_messages) as sim:
+        manifest = submit_sharded(messages, _submit, max_bytes=max_bytes, max_messages=max_messages)
+
+    assert len(manifest["feeds"]) == 10
+    assert [feed["error"] for feed in manifest["feeds"]] == [None] * 10
+    for feed in manifest["feeds"]:
+        document = next(d for d in sim.documents.values() if d["skus"] == feed["skus"])
+        assert document["uncompressed_bytes"] <= max_bytes
+        assert document["messages"] <= max_messages
+        assert sim.feeds[feed["feedId"]]["skus"] == feed["skus"]
+
+    # every SKU maps to the feed that actually carried it
+    assert set(manifest["skus"]) == {m["sku"] for m in messages}
+    for sku, feed_id in manifest["skus"].items():
+        assert feed_id is not None
+        assert sku in sim.feeds[feed_id]["skus"]
+
+    families = {}
+    for message in messages:
+        families.setdefault(_parent_sku(message), set()).add(manifest["skus"][message["sku"]])
+    assert all(len(feed_ids) == 1 for feed_ids in families.values())
+
+
+@pytest.mark.parametrize("max_bytes, max_messages", [(200_000, 1000), (5_000_000, 40)])
+def test_simulator_rejects_feeds_over_its_limits(max_bytes, max_messages):
+    with simulated(rate_scale=1000, max_feed_bytes=max_bytes, max_feed_messages=max_messages) as sim:
+        manifest = submit_sharded(_messages(2), _submit)
+
+    assert len(manifest["feeds"]) == 1
+    assert manifest["feeds"][0]["feedId"] is None
+    assert "400 Client Error" in manifest["feeds"][0]["error"]
+    assert set(manifest["skus"].values()) == {None}
+    assert not sim.feeds
+
+
+def test_shard_packed_up_to_the_limit_is_accepted():
+    # renumbered messageIds run to ~840 here, a few hundred bytes more than the families' own ids 1-28;
+    # a limit just under the single-feed size must split the shard rather than send it oversized
+    messages = _messages(30)
+    one_feed = write_feed(SECRETS["SELLER_ID"], [{**m, "messageId": idx} for idx, m in enumerate(messages, start=1)])
+    max_bytes = len(one_feed.read()) - 200
+    assert len(shard_messages(messages, max_bytes + 200 + HEADER_BYTES)) == 1
+
+    with simulated(rate_scale=1000, max_feed_bytes=max_bytes) as sim:
+        manifest = submit_sharded(messages, _submit, max_bytes=max_bytes)
+
+    assert len(manifest["feeds"]) == 2
+    assert [feed["error"] for feed in manifest["feeds"]] == [None, None]
+    assert max(d["uncompressed_bytes"] for d in sim.documents.values()) <= max_bytes
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZE = 1024 * 1024
+# generates, writes and uploads one combined feed in a fresh interpreter, then reports its peak RSS (ru_maxrss)
+CHILD = """
+import resource, sys
+import sp_api
+from feed_writer import write_feed
+from listing_feed import generate_listing_messages
+
+designs, url = int(sys.argv[1]), sys.argv[2]
+messages = (m for i in range(designs) for m in generate_listing_messages(f"Design {i}", "https://img", f"D-{i}"))
+feed = write_feed("A1SELLER", messages)
+sp_api.upload_feed_document(url, feed, "application/json")
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+class _DiscardHandler(BaseHTTPRequestHandler):
+    # reads the upload in chunks and keeps only its length, so the server's own memory stays flat
+    protocol_version = "HTTP/1.1"
+    received = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):
+        remaining = int(self.headers["Content-Length"])
+        self.received.append(remaining)
+        while remaining:
+            remaining -= len(self.rfile.read(min(CHUNK_SIZE, remaining)))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def upload_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DiscardHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/uploads/feed"
+    server.shutdown()
+    server.server_close()
+
+
+def _peak_rss(designs, url):
+    result = subprocess.run([sys.executable, "-c", CHILD, str(designs), url], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    return int(result.stdout.split()[-1])
+
+
+def test_peak_rss_stays_flat_as_the_feed_grows(upload_url):
+    peaks = {designs: _peak_rss(designs, upload_url) for designs in (100, 500, 2000)}
+    sizes = _DiscardHandler.received[-3:]
+
+    print(json.dumps({"peak_rss": peaks, "uploaded_bytes": sizes}))
+    assert sizes[2] > 15 * sizes[0]
+    # the feed grows 20x (to ~330 MB) while memory may only grow by allocator noise
+    assert peaks[2000] < peaks[100] * 1.25
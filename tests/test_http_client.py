@@ -0,0 +1,17 @@
+import pytest
+
+import http_client
+from benchmarks import bench_connections
+
+
+# shopify_api still sends its product calls with verify=False
+@pytest.mark.filterwarnings("ignore::urllib3.exceptions.InsecureRequestWarning")
+def test_500_sku_run_over_tls_reuses_keep_alive_connections():
+    [row] = bench_connections(skus=500, tls=True)
+
+    assert row["failed"] == 0
+    assert row["requests"] > 1000
+    limit = http_client.HOST_LIMITER.per_host_limit
+    for service in ("sp_api", "lwa", "documents", "imgbb", "shopify"):
+        assert 1 <= row[f"connections_{service}"] <= limit
+    assert row["connections"] <= 5 * limit
@@ -0,0 +1,58 @@
+from io import BytesIO
+
+from PIL import Image
+
+from image_prep import MAX_UPLOAD_SIDE, THUMBNAIL_SIZE, prepare_image, prepare_images
+
+
+def _png(mode, size, color=0):
+    out = BytesIO()
+    Image.new(mode, size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _open(data):
+    return Image.open(BytesIO(data))
+
+
+def test_validation_against_amazon_size_rules():
+    small, no_zoom, ok, huge = (prepare_image(name, _png("RGB", size)) for name, size in (
+        ("small.png", (400, 300)), ("no-zoom.png", (800, 600)), ("ok.png", (1200, 1000)), ("huge.png", (10001, 10))
+    ))
+    assert small["errors"] == ["400x300 is below Amazon's 500px minimum"]
+    assert no_zoom["errors"] == []
+    assert no_zoom["warnings"] == ["800x600 is below 1000px, so Amazon zoom will be disabled"]
+    assert ok["errors"] == [] and ok["warnings"] == []
+    assert huge["errors"] == ["10001x10 exceeds Amazon's 10000px maximum"]
+
+
+def test_large_images_are_downscaled_for_upload():
+    result = prepare_image("big.png", _png("RGB", (4000, 3000), (200, 30, 30)))
+    assert (result["width"], result["height"]) == (4000, 3000)
+    assert _open(result["payload"]).size == (MAX_UPLOAD_SIDE, 1920)
+    assert _open(result["thumbnail"]).size == (THUMBNAIL_SIZE[0], 300)
+
+
+def test_image_within_upload_size_keeps_the_smaller_encoding():
+    data = _png("RGB", (1200, 1000))
+    result = prepare_image("ok.png", data)
+    assert result["payload_bytes"] <= len(data)
+    assert _open(result["payload"]).size == (1200, 1000)
+
+
+def test_large_16_bit_grayscale_png_is_prepared():
+    result = prepare_image("gray16.png", _png("I;16", (3000, 2000), 40000))
+    assert result["errors"] == []
+    payload = _open(result["payload"])
+    assert (payload.mode, payload.size) == ("L", (MAX_UPLOAD_SIDE, 1707))
+    # scaled down to 8 bits rather than clipped to white
+    assert payload.getpixel((0, 0)) == 40000 // 256
+    assert _open(result["thumbnail"]).size == (THUMBNAIL_SIZE[0], 267)
+
+
+def test_unreadable_file_is_reported_in_input_order():
+    results = prepare_images([("a.png", _png("RGB", (600, 600))), ("b.png", b"not a png")], max_workers=1)
+    assert [r["name"] for r in results] == ["a.png", "b.png"]
+    assert results[0]["errors"] == []
+    assert results[1]["errors"][0].startswith("Could not read image")
+    assert results[1]["payload"] is None
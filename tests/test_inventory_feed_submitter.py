@@ -0,0 +1,89 @@
+import pytest
+
+import sp_api
+from benchmarks import SECRETS, simulated
+from feed_sharding import MAX_FEED_MESSAGES
+from inventory_feed_submitter import (InventorySnapshot, changed_inventory_rows, changed_listing_rows,
+                                      submit_listings_patch_feed)
+
+TOKEN = "Atza|test"
+
+
+@pytest.fixture
+def sent_shards(monkeypatch):
+    # records every shard handed to SP-API while still submitting it to the simulator
+    shards = []
+    submit = sp_api.submit_json_listings_feed
+
+    def record(messages, *args, **kwargs):
+        shards.append(messages)
+        return submit(messages, *args, **kwargs)
+
+    monkeypatch.setattr(sp_api, "submit_json_listings_feed", record)
+    return shards
+
+
+def _submit(skus, snapshot, prices=None):
+    return submit_listings_patch_feed(skus, TOKEN, SECRETS["MARKETPLACE_ID"], SECRETS["SELLER_ID"], prices=prices,
+                                      snapshot=snapshot, latency=2)
+
+
+def test_delta_rows_are_compared_against_the_snapshot(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.db"))
+    snapshot.update([("A", 5, 2), ("B", 5, 2), ("C", 5, 2, 19.99)])
+
+    skus = {"A": 5, "B": (6, 2), "C": 5, "D": 1}
+    assert changed_inventory_rows(skus, snapshot, latency=2) == [("B", 6, 2), ("D", 1, 2)]
+    # a SKU without a new price keeps its stored one; a different price is a change
+    assert changed_listing_rows(skus, {"A": 9.99, "C": 19.99}, snapshot, latency=2) == [
+        ("A", 5, 2, 9.99), ("B", 6, 2, None), ("D", 1, 2, None)
+    ]
+    assert changed_listing_rows({"C": 5}, {"C": 21.99}, snapshot, latency=2) == [("C", 5, 2, 21.99)]
+
+
+def test_streamed_input_keeps_its_order(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.db"))
+    snapshot.update((f"SKU-{i}", 1, 2) for i in range(1000))
+
+    rows = ((f"SKU-{i}", 1 if i % 7 else 2) for i in reversed(range(1200)))
+    expected = [(f"SKU-{i}", 1 if i % 7 else 2, 2) for i in reversed(range(1200)) if i >= 1000 or i % 7 == 0]
+    assert changed_inventory_rows(rows, snapshot, latency=2) == expected
+
+
+def test_patch_feed_sends_quantity_and_price_patches(tmp_path, sent_shards):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.db"))
+    with simulated(rate_scale=1000) as sim:
+        manifest = _submit({"A": 5, "B": 7}, snapshot)
+        priced = _submit({"A": 5, "B": 7}, snapshot, prices={"B": 24.99})
+        unchanged = _submit({"A": 5, "B": 7}, snapshot, prices={"B": 24.99})
+
+    assert set(manifest["skus"]) == {"A", "B"}
+    assert all(sim.feeds[feed_id]["skus"] for feed_id in manifest["skus"].values())
+    quantities, prices = sent_shards
+    assert [m["operationType"] for m in quantities] == ["PATCH", "PATCH"]
+    assert [[p["path"] for p in m["patches"]] for m in quantities] == [["/attributes/fulfillment_availability"]] * 2
+    assert quantities[1]["patches"][0]["value"][0]["quantity"] == 7
+
+    # only the repriced SKU goes out again, with its offer patch
+    assert list(priced["skus"]) == ["B"]
+    [message] = prices
+    assert [p["path"] for p in message["patches"]] == [
+        "/attributes/fulfillment_availability", "/attributes/purchasable_offer"
+    ]
+    assert message["patches"][1]["value"][0]["our_price"][0]["schedule"][0]["value_with_tax"] == 24.99
+    assert unchanged is None
+
+
+def test_patch_feed_snapshot_skips_skus_of_failed_shards(tmp_path, sent_shards):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.db"))
+    skus = {f"SKU-{i}": 3 for i in range(MAX_FEED_MESSAGES + 50)}
+    # the simulator rejects the full first shard but takes the 50-message second one
+    with simulated(rate_scale=1000, max_feed_messages=MAX_FEED_MESSAGES - 1):
+        manifest = _submit(skus, snapshot)
+
+    assert [len(shard) for shard in sent_shards] == [MAX_FEED_MESSAGES, 50]
+    assert [feed["feedId"] is None for feed in manifest["feeds"]] == [True, False]
+    # SKUs of the failed shard still differ from the snapshot and go out on the next run
+    assert [row[0] for row in changed_listing_rows(skus, None, snapshot, latency=2)] == [
+        f"SKU-{i}" for i in range(MAX_FEED_MESSAGES)
+    ]
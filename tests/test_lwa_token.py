@@ -0,0 +1,53 @@
+import threading
+import time
+
+from benchmarks import simulated
+from lwa_token import TokenCache
+
+
+def test_one_day_of_calls_refreshes_once_per_token_lifetime():
+    now = [0.0]
+    with simulated(token_ttl=3600) as sim:
+        cache = TokenCache("id", "secret", "refresh", background=False, clock=lambda: now[0])
+        tokens = set()
+        while now[0] < 24 * 3600:
+            tokens.add(cache.get())
+            now[0] += 1
+
+    # a token is replaced refresh_margin (300 s) before its hour runs out: ceil(86400 / 3300) = 27 refreshes
+    assert sim.snapshot()["lwaToken"]["requests"] == 27
+    assert cache.refresh_count == 27
+    assert len(tokens) == 27
+
+
+def test_concurrent_callers_share_one_refresh():
+    with simulated(latency={"lwaToken": 0.2}) as sim:
+        cache = TokenCache("id", "secret", "refresh", background=False)
+        barrier = threading.Barrier(20)
+        tokens = []
+
+        def call():
+            barrier.wait()
+            tokens.append(cache.get())
+
+        threads = [threading.Thread(target=call) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sim.snapshot()["lwaToken"]["requests"] == 1
+    assert len(tokens) == 20 and len(set(tokens)) == 1
+
+
+def test_background_refresh_replaces_the_token_before_it_expires():
+    # a 2 s token with a 1.5 s margin is refreshed in the background after 0.5 s
+    with simulated(token_ttl=2):
+        cache = TokenCache("id", "secret", "refresh", refresh_margin=1.5)
+        try:
+            first = cache.get()
+            time.sleep(1.2)
+            assert cache.refresh_count >= 2
+            assert cache.get() != first
+        finally:
+            cache.close()
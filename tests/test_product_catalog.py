@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from benchmarks import bench_catalog
+from product_catalog import load_catalog
+
+SPEC = {
+    "name": "shirt", "brand": "SIM", "marketplace_id": "ATVPDKIKX0DER", "product_type": "SHIRT",
+    "item_name_suffix": "Funny Shirt", "description": "<p>Sim</p>", "bullets": ["One"],
+    "size_codes": {"S": "S", "M": "M"}, "color_codes": {"Red": "R"}, "sleeve_codes": {"Short Sleeve": "SS"},
+    "variations": [{"size": size, "color": "Red", "sleeve": "Short Sleeve", "price": 20} for size in ("S", "M")]
+}
+
+
+def _write(path, spec):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(spec, f)
+
+
+def test_default_catalog_loads():
+    line = load_catalog().line()
+    assert line.title_suffix == "Baby Bodysuit"
+    assert line.handle_suffix == "baby-bodysuit"
+    assert line.variation_for_sku(f"ABC-1234-{line.variations[0]['sku_suffix']}") is line.variations[0]
+
+
+def test_catalog_without_design_suffixes_loads(tmp_path):
+    _write(tmp_path / "plain.json", SPEC)
+    _write(tmp_path / "shopify.json", dict(SPEC, name="tee", shopify={"product_type": "Graphic Tee"}))
+    _write(tmp_path / "explicit.json", dict(SPEC, name="top", title_suffix="Kids Top", handle_suffix="top"))
+    catalog = load_catalog(str(tmp_path))
+
+    assert [(catalog.line(n).title_suffix, catalog.line(n).handle_suffix) for n in ("shirt", "tee", "top")] == [
+        ("Funny Shirt", "funny-shirt"), ("Graphic Tee", "graphic-tee"), ("Kids Top", "top")
+    ]
+    assert [v["sku_suffix"] for v in catalog.line("shirt").variations] == ["S-R-SS", "M-R-SS"]
+
+
+def test_duplicate_line_names_are_rejected(tmp_path):
+    _write(tmp_path / "lines.json", [SPEC, SPEC])
+    with pytest.raises(ValueError, match="Duplicate product line names"):
+        load_catalog(str(tmp_path))
+
+
+def test_catalog_benchmark_runs():
+    [result] = bench_catalog(lines=2, variations=8, lookups=100)
+    assert result["lines"] == 2
@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+
+import pytest
+
+import tracing
+
+
+def test_concurrent_exports_each_write_whole_files(tmp_path):
+    tracer = tracing.Tracer()
+    for i in range(200):
+        with tracer.span(f"call-{i}", "sp_api"):
+            pass
+    barrier = threading.Barrier(16)
+    errors = []
+
+    def export():
+        barrier.wait()
+        try:
+            tracing.export(tracer, str(tmp_path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=export) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == sorted([tracing.JSON_EXPORT_NAME, tracing.PROMETHEUS_EXPORT_NAME])
+    with open(tmp_path / tracing.JSON_EXPORT_NAME, encoding="utf-8") as f:
+        assert len(json.load(f)["raw_spans"]) == 200
+
+
+def test_failed_export_leaves_no_temp_file(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tracing.os, "replace", fail)
+    with pytest.raises(OSError):
+        tracing.export(tracing.Tracer(), str(tmp_path))
+    assert os.listdir(tmp_path) == []
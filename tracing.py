@@ -0,0 +1,280 @@
+import functools
+import itertools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MAX_SPANS = 50000  # oldest spans are dropped beyond this
+DEFAULT_EXPORT_DIR = "traces"
+JSON_EXPORT_NAME = "pipeline_spans.json"
+PROMETHEUS_EXPORT_NAME = "pipeline_metrics.prom"
+QUANTILES = (0.5, 0.95)
+
+
+def _quantile(sorted_values, q):
+    # nearest-rank, which is what the p50/p95 table shows
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def _is_error(span):
+    return bool(span["error"]) or bool(span["status_codes"] and span["status_codes"][-1] >= 400)
+
+
+class Tracer:
+    """
+    Records timed spans for the pipeline's network calls and generators.
+
+    Every span has a name and a stage (imgbb, shopify, lwa, sp_api, sp_api_upload, feed_generation,
+    image_prep). A span opened without a stage inherits its parent's; a top-level one only groups its children.
+    HTTP spans opened by http_client carry the status code of every attempt, the retry count and the bytes
+    sent and received, and these add up into their enclosing spans. Spans nest per thread; use wrap() to carry
+    the current span into a worker thread.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS, clock=time.perf_counter):
+        self.enabled = True
+        self.clock = clock
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, stage=None, **attrs):
+        """
+        Times the block as one span and yields its record; callers may add status codes, bytes or attributes.
+        With stage=None the span takes its enclosing span's stage (HTTP spans outside any span get "http").
+        """
+        if not self.enabled:
+            yield {"status_codes": [], "bytes_sent": 0, "bytes_received": 0, "retries": 0, "attrs": {}}
+            return
+        parent = self.current()
+        if stage is None:
+            stage = parent["stage"] if parent else ("http" if attrs.get("kind") == "http" else None)
+        record = {
+            "span_id": next(self._ids),
+            "parent_id": parent["span_id"] if parent else None,
+            "parent_stage": parent["stage"] if parent else None,
+            "name": name,
+            "stage": stage,
+            "started_at": time.time(),
+            "seconds": 0.0,
+            "status_codes": [],
+            "retries": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "error": None,
+            "attrs": attrs
+        }
+        stack = self._stack()
+        stack.append(record)
+        start = self.clock()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["seconds"] = self.clock() - start
+            stack.pop()
+            with self._lock:
+                if parent is not None:
+                    parent["retries"] += record["retries"]
+                    parent["bytes_sent"] += record["bytes_sent"]
+                    parent["bytes_received"] += record["bytes_received"]
+                self._spans.append(record)
+
+    def traced(self, name=None, stage=None):
+        """
+        Decorator form of span(); the span name defaults to module.function.
+        """
+        def decorate(fn):
+            span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    @contextmanager
+    def attach(self, parent):
+        """
+        Makes parent (a span from another thread) the enclosing span of this thread for the block.
+        """
+        stack = self._stack()
+        if parent is not None:
+            stack.append(parent)
+        try:
+            yield
+        finally:
+            if parent is not None:
+                stack.pop()
+
+    def wrap(self, fn):
+        """
+        Binds fn to the caller's current span so spans it opens on a pool thread nest under it.
+        """
+        parent = self.current()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.attach(parent):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self):
+        """
+        Returns {"stages": [...], "spans": [...]}.
+
+        stages is the per-stage breakdown: only spans entering a stage from outside it are counted, so nested
+        calls within a stage are not double-counted. spans has one row per span name. Both carry calls,
+        total/p50/p95/max seconds, errors, retries and bytes sent and received.
+        """
+        spans = self.spans()
+        by_stage, by_name = {}, {}
+        for span in spans:
+            if span["stage"] and span["stage"] != span["parent_stage"]:
+                by_stage.setdefault(span["stage"], []).append(span)
+            by_name.setdefault((span["name"], span["stage"]), []).append(span)
+
+        def row(group):
+            seconds = sorted(s["seconds"] for s in group)
+            return {
+                "calls": len(group),
+                "total_seconds": sum(seconds),
+                **{f"p{int(q * 100)}_seconds": _quantile(seconds, q) for q in QUANTILES},
+                "max_seconds": seconds[-1],
+                "errors": sum(1 for s in group if _is_error(s)),
+                "retries": sum(s["retries"] for s in group),
+                "bytes_sent": sum(s["bytes_sent"] for s in group),
+                "bytes_received": sum(s["bytes_received"] for s in group)
+            }
+
+        stages = [dict(stage=stage, **row(group)) for stage, group in by_stage.items()]
+        stages.sort(key=lambda r: r["total_seconds"], reverse=True)
+        total = sum(r["total_seconds"] for r in stages) or 1.0
+        for r in stages:
+            r["share"] = r["total_seconds"] / total
+        rows = [dict(name=name, stage=stage, **row(group)) for (name, stage), group in by_name.items()]
+        rows.sort(key=lambda r: r["total_seconds"], reverse=True)
+        return {"stages": stages, "spans": rows}
+
+    def status_counts(self):
+        counts = {}
+        for span in self.spans():
+            if span["attrs"].get("kind") != "http":
+                continue
+            for status in span["status_codes"]:
+                key = (span["stage"], status)
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(tracer):
+    """
+    Renders the tracer's summary in the Prometheus text exposition format.
+    """
+    summary = tracer.summary()
+    lines = [
+        "# HELP pipeline_span_seconds Latency of traced pipeline calls.",
+        "# TYPE pipeline_span_seconds summary"
+    ]
+    for r in summary["spans"]:
+        labels = {"name": r["name"], "stage": r["stage"] or ""}
+        for q in QUANTILES:
+            lines.append(f"pipeline_span_seconds{_labels(**labels, quantile=q)} {r[f'p{int(q * 100)}_seconds']:.6f}")
+        lines.append(f"pipeline_span_seconds_sum{_labels(**labels)} {r['total_seconds']:.6f}")
+        lines.append(f"pipeline_span_seconds_count{_labels(**labels)} {r['calls']}")
+    for metric, key, help_text in (
+        ("pipeline_span_errors_total", "errors", "Traced calls that raised or ended with an HTTP error."),
+        ("pipeline_span_retries_total", "retries", "HTTP retries made inside traced calls.")
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{_labels(name=r['name'], stage=r['stage'] or '')} {r[key]}" for r in summary["spans"]]
+    lines += ["# HELP pipeline_stage_seconds_total Time spent per pipeline stage.",
+              "# TYPE pipeline_stage_seconds_total counter"]
+    lines += [f"pipeline_stage_seconds_total{_labels(stage=r['stage'])} {r['total_seconds']:.6f}"
+              for r in summary["stages"]]
+    lines += ["# HELP pipeline_stage_bytes_total Payload bytes per pipeline stage.",
+              "# TYPE pipeline_stage_bytes_total counter"]
+    for r in summary["stages"]:
+        lines.append(f"pipeline_stage_bytes_total{_labels(stage=r['stage'], direction='sent')} {r['bytes_sent']}")
+        lines.append(f"pipeline_stage_bytes_total{_labels(stage=r['stage'], direction='received')} "
+                     f"{r['bytes_received']}")
+    lines += ["# HELP pipeline_http_responses_total HTTP responses per stage and status code.",
+              "# TYPE pipeline_http_responses_total counter"]
+    lines += [f"pipeline_http_responses_total{_labels(stage=stage, code=status)} {count}"
+              for (stage, status), count in sorted(tracer.status_counts().items())]
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    # each call writes its own temp file, so concurrent exports don't race on a shared temp path
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=f".{os.path.basename(path)}.",
+                                      suffix=".tmp", delete=False)
+    try:
+        with tmp as f:
+            f.write(text)
+        os.chmod(tmp.name, 0o644)  # temp files start 0600; the textfile collector runs as another user
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+
+def export(tracer=None, export_dir=DEFAULT_EXPORT_DIR):
+    """
+    Writes the raw spans plus summary as JSON and the summary as a Prometheus text file (e.g. for the node
+    exporter's textfile collector). Returns (json_path, prometheus_path).
+    """
+    tracer = tracer or TRACER
+    json_path = os.path.join(export_dir, JSON_EXPORT_NAME)
+    prometheus_path = os.path.join(export_dir, PROMETHEUS_EXPORT_NAME)
+    _write_atomic(json_path, json.dumps({
+        "exported_at": time.time(),
+        **tracer.summary(),
+        "raw_spans": tracer.spans()
+    }, default=str))
+    _write_atomic(prometheus_path, prometheus_text(tracer))
+    return json_path, prometheus_path
+
+
+TRACER = Tracer()
+span = TRACER.span
+traced = TRACER.traced
+wrap = TRACER.wrap
@@ -0,0 +1,131 @@
+import hashlib
+import time
+
+import sqlite_store
+
+DEFAULT_DB_PATH = "upload_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    digest TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    imgbb_url TEXT,
+    product_id INTEGER,
+    image_src TEXT,
+    slug TEXT,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (digest, handle)
+);
+CREATE INDEX IF NOT EXISTS uploads_last_used ON uploads (last_used_at);
+"""
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadCache:
+    """
+    Persistent record of finished ImgBB uploads and Shopify products, keyed by image content hash
+    and product handle, so a re-run batch skips the designs that already went through.
+    Each step is stored as soon as it succeeds: a design whose Shopify call failed only retries that call.
+    The design's slug (its SKU prefix) is kept too, so a re-run lists it under the same SKUs.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        sqlite_store.initialize(self.path, SCHEMA, {"uploads": {"slug": "TEXT"}})
+        with self._connect() as conn:
+            # created after the migration, which adds slug to caches from before it existed
+            conn.execute("CREATE INDEX IF NOT EXISTS uploads_slug ON uploads (slug)")
+
+    def _connect(self):
+        return sqlite_store.connect(self.path)
+
+    def get(self, digest, handle):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM uploads WHERE digest = ? AND handle = ?", (digest, handle)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE uploads SET last_used_at = ? WHERE digest = ? AND handle = ?",
+                         (time.time(), digest, handle))
+            return dict(row)
+
+    def put_imgbb(self, digest, handle, imgbb_url):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO uploads (digest, handle, imgbb_url, created_at, last_used_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (digest, handle) DO UPDATE SET imgbb_url = excluded.imgbb_url, "
+                "last_used_at = excluded.last_used_at",
+                (digest, handle, imgbb_url, now, now)
+            )
+
+    def put_product(self, digest, handle, product_id, image_src):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO uploads (digest, handle, product_id, image_src, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (digest, handle) DO UPDATE SET product_id = excluded.product_id, "
+                "image_src = excluded.image_src, last_used_at = excluded.last_used_at",
+                (digest, handle, product_id, image_src, now, now)
+            )
+
+    def claim_slug(self, digest, handle, slug):
+        """
+        Stores slug for the design unless it already has one, and returns the design's slug.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO uploads (digest, handle, slug, created_at, last_used_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (digest, handle) DO UPDATE SET slug = COALESCE(uploads.slug, excluded.slug), "
+                "last_used_at = excluded.last_used_at",
+                (digest, handle, slug, now, now)
+            )
+            return conn.execute("SELECT slug FROM uploads WHERE digest = ? AND handle = ?",
+                                (digest, handle)).fetchone()["slug"]
+
+    def slug_taken(self, slug):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM uploads WHERE slug = ? LIMIT 1", (slug,)).fetchone() is not None
+
+    def invalidate(self, handle=None, digest=None):
+        """
+        Forgets matching entries so their next run uploads again. With no arguments, clears the cache.
+        Returns the number of entries removed.
+        """
+        clauses, params = [], []
+        if handle:
+            clauses.append("handle = ?")
+            params.append(handle)
+        if digest:
+            clauses.append("digest = ?")
+            params.append(digest)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM uploads {where}", params).rowcount
+
+    def evict(self, max_age=None, max_entries=None):
+        """
+        Drops entries not used for max_age seconds, then the least recently used ones beyond max_entries.
+        Returns the number of entries removed.
+        """
+        removed = 0
+        with self._connect() as conn:
+            if max_age is not None:
+                removed += conn.execute("DELETE FROM uploads WHERE last_used_at < ?",
+                                        (time.time() - max_age,)).rowcount
+            if max_entries is not None:
+                removed += conn.execute(
+                    "DELETE FROM uploads WHERE rowid NOT IN "
+                    "(SELECT rowid FROM uploads ORDER BY last_used_at DESC LIMIT ?)",
+                    (max_entries,)
+                ).rowcount
+        return removed
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]